@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptive Concurrency Limiter
+کنترل تطبیقی (AIMD) تعداد تست‌های همزمان بر اساس خطاها و تأخیر event loop
+"""
+
+import asyncio
+import errno
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# خطاهای محلی (کمبود file descriptor، پورت محلی یا بافر) نشانه فشار روی همین میزبان هستند
+LOCAL_ERRNOS = frozenset(code for code in (
+    getattr(errno, 'EMFILE', None),
+    getattr(errno, 'ENFILE', None),
+    getattr(errno, 'EADDRNOTAVAIL', None),
+    getattr(errno, 'EADDRINUSE', None),
+    getattr(errno, 'ENOBUFS', None),
+) if code is not None)
+
+OUTCOMES = ('ok', 'error', 'timeout', 'local')
+
+
+def classify_error(error: BaseException) -> str:
+    """نوع نتیجه یک تلاش ناموفق: timeout، local (خطای میزبان) یا error (سمت سرور)"""
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(error, OSError) and error.errno in LOCAL_ERRNOS:
+        return 'local'
+    return 'error'
+
+
+class AdaptiveLimiter:
+    """
+    پنجره همزمانی با افزایش جمعی و کاهش ضربی (AIMD)
+
+    پس از هر دور (تکمیل به اندازه پنجره فعلی) اگر نرخ timeout نسبت به
+    میانگین دورهای قبل جهش نکرده و تأخیر event loop سالم باشد، پنجره
+    increase واحد بزرگ‌تر می‌شود؛ در غیر این صورت در decrease ضرب می‌شود.
+    خطاهای محلی (EMFILE، اتمام پورت محلی) حداکثر یک بار در هر دور باعث
+    کاهش فوری می‌شوند. رد اتصال از سمت سرور نشانه سلامت شبکه است.
+    """
+
+    def __init__(self, initial: int = 256, minimum: int = 16, maximum: int = 2000,
+                 increase: int = 32, decrease: float = 0.5,
+                 timeout_spike: float = 0.2, max_loop_lag: float = 0.1,
+                 adaptive: bool = True):
+        self.minimum = max(1, min(minimum, maximum))
+        self.maximum = max(self.minimum, maximum)
+        self.window = self.maximum if not adaptive else max(self.minimum, min(initial, self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.timeout_spike = timeout_spike
+        self.max_loop_lag = max_loop_lag
+        self.adaptive = adaptive
+
+        self.in_flight = 0
+        self.loop_lag = 0.0
+        self.peak_window = self.window
+        self.stats: Dict[str, int] = {'increases': 0, 'decreases': 0, 'local_errors': 0}
+
+        self._loop = None
+        self._waiters: deque = deque()
+        self._round = {outcome: 0 for outcome in OUTCOMES}
+        self._round_id = 0
+        self._cut_round = -1
+        self._baseline_timeouts: Optional[float] = None
+        self._lag_probe_scheduled = False
+
+    def _bind_loop(self):
+        # صف انتظار به event loop جاری وابسته است؛ پنجره بین loop‌ها حفظ می‌شود
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = deque()
+            self.in_flight = 0
+            self._lag_probe_scheduled = False
+        return loop
+
+    async def acquire(self):
+        """گرفتن یک جایگاه در پنجره"""
+        loop = self._bind_loop()
+        while self.in_flight >= self.window:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                else:
+                    try:
+                        self._waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                raise
+        self.in_flight += 1
+        if self.adaptive and not self._lag_probe_scheduled:
+            self._schedule_lag_probe(loop)
+
+    def release(self, outcome: Optional[str] = 'ok'):
+        """آزاد کردن جایگاه و ثبت نتیجه تلاش (None: تلاش لغو شده، بدون ثبت)"""
+        self.in_flight = max(0, self.in_flight - 1)
+        if self.adaptive and outcome is not None:
+            self._record(outcome)
+        self._wake()
+
+    def _wake(self):
+        free = self.window - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _schedule_lag_probe(self, loop, interval: float = 0.05):
+        # تأخیر اجرای callback نسبت به زمان مقرر = تأخیر event loop
+        self._lag_probe_scheduled = True
+        expected = loop.time() + interval
+        loop.call_later(interval, self._on_lag_probe, loop, expected)
+
+    def _on_lag_probe(self, loop, expected: float):
+        lag = max(0.0, loop.time() - expected)
+        self.loop_lag = 0.7 * self.loop_lag + 0.3 * lag
+        if loop is self._loop and (self.in_flight or self._waiters):
+            self._schedule_lag_probe(loop)
+        else:
+            self._lag_probe_scheduled = False
+
+    def _record(self, outcome: str):
+        round_stats = self._round
+        round_stats[outcome] += 1
+
+        if outcome == 'local':
+            self.stats['local_errors'] += 1
+            if self._cut_round != self._round_id:
+                self._cut_round = self._round_id
+                self._shrink('خطای محلی')
+            return
+
+        completed = sum(round_stats.values())
+        if completed < self.window:
+            return
+
+        # پایان یک دور
+        timeout_ratio = round_stats['timeout'] / completed
+        baseline = self._baseline_timeouts
+        spike = baseline is not None and timeout_ratio > baseline + self.timeout_spike
+
+        if self._cut_round == self._round_id:
+            pass  # در این دور پیش‌تر کاهش یافته است
+        elif spike:
+            self._shrink(f"جهش timeout ({timeout_ratio:.0%})")
+        elif self.loop_lag > self.max_loop_lag:
+            self._shrink(f"تأخیر event loop ({self.loop_lag * 1000:.0f}ms)")
+        elif self.window < self.maximum:
+            self.window = min(self.maximum, self.window + self.increase)
+            self.peak_window = max(self.peak_window, self.window)
+            self.stats['increases'] += 1
+
+        self._baseline_timeouts = timeout_ratio if baseline is None \
+            else 0.8 * baseline + 0.2 * timeout_ratio
+        self._round = {outcome: 0 for outcome in OUTCOMES}
+        self._round_id += 1
+
+    def _shrink(self, reason: str):
+        window = max(self.minimum, int(self.window * self.decrease))
+        if window < self.window:
+            logger.debug(f"کاهش پنجره همزمانی {self.window} → {window}: {reason}")
+            self.window = window
+            self.stats['decreases'] += 1
+
+    def summary(self) -> Dict[str, float]:
+        return dict(self.stats, window=self.window, peak_window=self.peak_window,
+                    maximum=self.maximum, in_flight=self.in_flight,
+                    loop_lag_ms=round(self.loop_lag * 1000, 1))
@@ -13,6 +13,7 @@ import json
 
 # Import core modules
 from config_collector import V2RayCollector
+from feature_store import FeatureStore
 from config import CONFIG_SOURCES
 
 # Import advanced modules
@@ -65,7 +66,8 @@ class AdvancedCollector:
         self.health_checker = HealthChecker() if HEALTH_CHECK_AVAILABLE and enable_all_features else None
         self.error_recovery = ErrorRecovery() if ERROR_RECOVERY_AVAILABLE and enable_all_features else None
         self.database = DatabaseManager() if DATABASE_AVAILABLE and enable_all_features else None
-        self.ml_scorer = MLConfigScorer() if ML_SCORING_AVAILABLE and enable_all_features else None
+        self.ml_scorer = MLConfigScorer(feature_store=self.collector.feature_store) \
+            if ML_SCORING_AVAILABLE and enable_all_features else None
         
         self.logger.info("🚀 Advanced Collector initialized")
         self.logger.info(f"   Health Check: {'✅' if self.health_checker else '❌'}")
@@ -121,7 +123,8 @@ class AdvancedCollector:
                         'country': c.country,
                         'latency': f"{c.latency}ms" if hasattr(c, 'latency') else '999ms',
                         'address': c.address,
-                        'id': f"{c.address}:{c.port}"
+                        'id': f"{c.address}:{c.port}",
+                        'feature_key': FeatureStore.key_for(c)
                     }
                     for c in all_configs[:100]  # Score first 100
                 ]
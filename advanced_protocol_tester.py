@@ -6,8 +6,7 @@ Advanced Protocol Tester for V2Ray Configs
 
 import asyncio
 import aiohttp
-import ssl
-import socket
+import hashlib
 import struct
 import time
 import json
@@ -15,173 +14,93 @@ import base64
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from probe_engine import AsyncProbeEngine
+
 logger = logging.getLogger(__name__)
 
 
 class AdvancedProtocolTester:
     """تست پیشرفته پروتکل‌های V2Ray"""
 
-    def __init__(self):
+    def __init__(self, engine: Optional[AsyncProbeEngine] = None):
         self.test_results = {}
+        # موتور تست مشترک: محدودیت همزمانی و timeout هر مرحله
+        self.engine = engine or AsyncProbeEngine(
+            max_concurrency=500, timeout=5.0, tls_timeout=5.0, first_byte_timeout=5.0)
+
+    @staticmethod
+    def _connect_host(config) -> str:
+        """IP resolve شده (در صورت وجود) برای جلوگیری از getaddrinfo در هر تلاش"""
+        return getattr(config, 'resolved_ip', '') or config.address
+
+    async def _handshake(self, config, payload: bytes, tls: bool = False):
+        return await self.engine.handshake(
+            self._connect_host(config), config.port, tls=tls,
+            server_hostname=getattr(config, 'sni', '') or config.address,
+            payload=payload)
+
+    @staticmethod
+    def _phase_details(result) -> Dict:
+        return {
+            'connect_ms': result.connect_ms,
+            'tls_ms': result.tls_ms,
+            'first_byte_ms': result.first_byte_ms,
+        }
 
     async def test_vmess_handshake(self, config) -> Tuple[bool, float, Dict]:
         """تست واقعی VMess handshake"""
-        try:
-            start_time = time.time()
-
-            # ایجاد VMess request packet
-            vmess_packet = self._create_vmess_packet(config)
-
-            # تست اتصال و handshake
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(config.address, config.port),
-                timeout=10
-            )
-
-            # ارسال VMess packet
-            writer.write(vmess_packet)
-            await writer.drain()
+        result = await self._handshake(config, self._create_vmess_packet(config))
+        if not result.ok:
+            return False, 0.0, {'error': f'{result.phase} failed'}
 
-            # دریافت response
-            response = await asyncio.wait_for(
-                reader.read(1024),
-                timeout=5
-            )
+        # بررسی response
+        is_valid = len(result.response) > 0 and not result.response.startswith(b'HTTP')
 
-            writer.close()
-            await writer.wait_closed()
-
-            latency = (time.time() - start_time) * 1000
-
-            # بررسی response
-            is_valid = len(response) > 0 and not response.startswith(b'HTTP')
-
-            return is_valid, latency, {
-                'response_size': len(response),
-                'handshake_success': is_valid
-            }
-
-        except Exception as e:
-            return False, 0.0, {'error': str(e)}
+        return is_valid, result.latency, dict(self._phase_details(result), **{
+            'response_size': len(result.response),
+            'handshake_success': is_valid
+        })
 
     async def test_vless_handshake(self, config) -> Tuple[bool, float, Dict]:
         """تست واقعی VLESS handshake"""
-        try:
-            start_time = time.time()
+        result = await self._handshake(config, self._create_vless_packet(config))
+        if not result.ok:
+            return False, 0.0, {'error': f'{result.phase} failed'}
 
-            # ایجاد VLESS request
-            vless_packet = self._create_vless_packet(config)
+        is_valid = len(result.response) > 0
 
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(config.address, config.port),
-                timeout=10
-            )
-
-            # ارسال VLESS packet
-            writer.write(vless_packet)
-            await writer.drain()
-
-            # دریافت response
-            response = await asyncio.wait_for(
-                reader.read(1024),
-                timeout=5
-            )
-
-            writer.close()
-            await writer.wait_closed()
-
-            latency = (time.time() - start_time) * 1000
-            is_valid = len(response) > 0
-
-            return is_valid, latency, {
-                'response_size': len(response),
-                'protocol_version': 'v1' if is_valid else None
-            }
-
-        except Exception as e:
-            return False, 0.0, {'error': str(e)}
+        return is_valid, result.latency, dict(self._phase_details(result), **{
+            'response_size': len(result.response),
+            'protocol_version': 'v1' if is_valid else None
+        })
 
     async def test_trojan_handshake(self, config) -> Tuple[bool, float, Dict]:
         """تست واقعی Trojan handshake"""
-        try:
-            start_time = time.time()
-
-            # ایجاد Trojan request
-            trojan_packet = self._create_trojan_packet(config)
-
-            # اتصال با TLS
-            context = ssl.create_default_context()
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(
-                    config.address, config.port, ssl=context
-                ),
-                timeout=10
-            )
+        result = await self._handshake(
+            config, self._create_trojan_packet(config), tls=True)
+        if not result.ok:
+            return False, 0.0, {'error': f'{result.phase} failed'}
 
-            # ارسال Trojan packet
-            writer.write(trojan_packet)
-            await writer.drain()
+        is_valid = len(result.response) > 0
 
-            # دریافت response
-            response = await asyncio.wait_for(
-                reader.read(1024),
-                timeout=5
-            )
-
-            writer.close()
-            await writer.wait_closed()
-
-            latency = (time.time() - start_time) * 1000
-            is_valid = len(response) > 0
-
-            return is_valid, latency, {
-                'tls_version': 'TLS 1.2+',
-                'response_size': len(response),
-                'ssl_verified': False  # ما SSL را verify نمی‌کنیم
-            }
-
-        except Exception as e:
-            return False, 0.0, {'error': str(e)}
+        return is_valid, result.latency, dict(self._phase_details(result), **{
+            'tls_version': 'TLS 1.2+',
+            'response_size': len(result.response),
+            'ssl_verified': False  # ما SSL را verify نمی‌کنیم
+        })
 
     async def test_shadowsocks_handshake(self, config) -> Tuple[bool, float, Dict]:
         """تست واقعی Shadowsocks handshake"""
-        try:
-            start_time = time.time()
+        result = await self._handshake(config, self._create_ss_packet(config))
+        if not result.ok:
+            return False, 0.0, {'error': f'{result.phase} failed'}
 
-            # ایجاد Shadowsocks request
-            ss_packet = self._create_ss_packet(config)
+        is_valid = len(result.response) > 0
 
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(config.address, config.port),
-                timeout=10
-            )
-
-            # ارسال Shadowsocks packet
-            writer.write(ss_packet)
-            await writer.drain()
-
-            # دریافت response
-            response = await asyncio.wait_for(
-                reader.read(1024),
-                timeout=5
-            )
-
-            writer.close()
-            await writer.wait_closed()
-
-            latency = (time.time() - start_time) * 1000
-            is_valid = len(response) > 0
-
-            return is_valid, latency, {
-                'encryption_method': 'AES-256-GCM',
-                'response_size': len(response)
-            }
-
-        except Exception as e:
-            return False, 0.0, {'error': str(e)}
+        return is_valid, result.latency, dict(self._phase_details(result), **{
+            'encryption_method': 'AES-256-GCM',
+            'response_size': len(result.response)
+        })
 
     async def test_speed_benchmark(self, config) -> Dict:
         """تست سرعت واقعی با download test"""
@@ -241,6 +160,23 @@ class AdvancedProtocolTester:
         # ساختار ساده Shadowsocks request
         return b'\x05\x01\x00'  # SOCKS5 handshake
 
+    async def test_handshake(self, config) -> Tuple[bool, float, Dict]:
+        """تست handshake بر اساس پروتکل"""
+        if config.protocol == 'vmess':
+            return await self.test_vmess_handshake(config)
+        elif config.protocol == 'vless':
+            return await self.test_vless_handshake(config)
+        elif config.protocol == 'trojan':
+            return await self.test_trojan_handshake(config)
+        elif config.protocol in ['ss', 'ssr']:
+            return await self.test_shadowsocks_handshake(config)
+
+        # تست ساده TCP برای پروتکل‌های دیگر
+        result = await self._handshake(config, b'')
+        if result.ok:
+            return True, result.latency, {'tcp_test': True}
+        return False, 0.0, {'error': 'TCP connection failed'}
+
     async def comprehensive_test(self, config) -> Dict:
         """تست جامع یک کانفیگ"""
         results = {
@@ -250,30 +186,7 @@ class AdvancedProtocolTester:
             'tests': {}
         }
 
-        # تست handshake بر اساس پروتکل
-        if config.protocol == 'vmess':
-            is_working, latency, details = await self.test_vmess_handshake(config)
-        elif config.protocol == 'vless':
-            is_working, latency, details = await self.test_vless_handshake(config)
-        elif config.protocol == 'trojan':
-            is_working, latency, details = await self.test_trojan_handshake(config)
-        elif config.protocol in ['ss', 'ssr']:
-            is_working, latency, details = await self.test_shadowsocks_handshake(config)
-        else:
-            # تست ساده TCP برای پروتکل‌های دیگر
-            try:
-                start_time = time.time()
-                reader, writer = await asyncio.wait_for(
-                    asyncio.open_connection(config.address, config.port),
-                    timeout=10
-                )
-                writer.close()
-                await writer.wait_closed()
-                latency = (time.time() - start_time) * 1000
-                is_working, details = True, {'tcp_test': True}
-            except:
-                is_working, latency, details = False, 0.0, {
-                    'error': 'TCP connection failed'}
+        is_working, latency, details = await self.test_handshake(config)
 
         results['tests']['handshake'] = {
             'success': is_working,
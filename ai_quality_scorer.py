@@ -5,21 +5,24 @@ AI Quality Scorer - سیستم هوش مصنوعی برای ارزیابی کی
 AI-Powered Quality Assessment System for V2Ray Configurations
 """
 
+import copy
 import json
 import re
 import time
 import hashlib
+import threading
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Any
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-import joblib
 import os
 
+# sklearn و joblib فقط برای آموزش لازم‌اند و در متدهای آموزش import می‌شوند؛
+# پیش‌بینی با نسخه فشرده NumPy مدل انجام می‌شود
+from compiled_forest import CompiledForest, compiled_path_for, export_forest
+from training_reservoir import DEFAULT_AI_TRAINING_CONFIG, TrainingReservoir
+
 # تنظیمات لاگ
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -59,12 +62,30 @@ class ConfigFeatures:
 
 
 class AIQualityScorer:
-    """سیستم هوش مصنوعی برای ارزیابی کیفیت کانفیگ‌ها"""
-
-    def __init__(self, model_path: str = "models/quality_model.pkl"):
+    """
+    سیستم هوش مصنوعی برای ارزیابی کیفیت کانفیگ‌ها
+
+    مدل sklearn فقط برای آموزش بارگذاری می‌شود؛ پیش‌بینی از نسخه فشرده
+    (compiled_path) استفاده می‌کند که بدون sklearn بارگذاری و اجرا می‌شود.
+    نتایج واقعی تست‌ها در TrainingReservoir جمع می‌شوند و update_model با
+    هر بار اجرا چند درخت جدید روی آن‌ها به جنگل اضافه و قدیمی‌ترین
+    درخت‌ها را حذف می‌کند.
+    """
+
+    def __init__(self, model_path: str = "models/quality_model.pkl",
+                 training_config: Optional[Dict] = None):
         self.model_path = model_path
+        self.compiled_path = compiled_path_for(model_path)
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
+        self.compiled: Optional[CompiledForest] = None
+        self.training_config = dict(DEFAULT_AI_TRAINING_CONFIG)
+        self.training_config.update(training_config or {})
+        self.reservoir = TrainingReservoir(
+            self.training_config['reservoir_file'] if self.training_config['enabled'] else None,
+            capacity=self.training_config['reservoir_size'],
+            max_pending=self.training_config['max_pending'])
+        self._training_lock = threading.Lock()
         self.feature_importance = {}
         self.quality_thresholds = {
             'excellent': 0.85,
@@ -80,15 +101,16 @@ class AIQualityScorer:
         self._load_or_create_model()
 
     def _load_or_create_model(self):
-        """بارگذاری یا ایجاد مدل ML"""
+        """بارگذاری مدل فشرده، یا ساخت آن از مدل sklearn، یا ایجاد مدل ML"""
         try:
-            if os.path.exists(self.model_path):
+            if self._compiled_is_current():
+                self.compiled = CompiledForest.load(self.compiled_path)
+                self.feature_importance = self.compiled.feature_importance
+                logger.info("✅ مدل فشرده با موفقیت بارگذاری شد")
+            elif os.path.exists(self.model_path):
                 logger.info("🔄 بارگذاری مدل موجود...")
-                model_data = joblib.load(self.model_path)
-                self.model = model_data['model']
-                self.scaler = model_data['scaler']
-                self.feature_importance = model_data.get(
-                    'feature_importance', {})
+                self._load_sklearn_model()
+                self._export_compiled()
                 logger.info("✅ مدل با موفقیت بارگذاری شد")
             else:
                 logger.info("🆕 ایجاد مدل جدید...")
@@ -97,23 +119,59 @@ class AIQualityScorer:
             logger.error(f"❌ خطا در بارگذاری مدل: {e}")
             self._create_new_model()
 
+    def _compiled_is_current(self) -> bool:
+        """مدل فشرده وجود دارد و از مدل sklearn قدیمی‌تر نیست"""
+        if not os.path.exists(self.compiled_path):
+            return False
+        return (not os.path.exists(self.model_path)
+                or os.path.getmtime(self.compiled_path) >= os.path.getmtime(self.model_path))
+
+    def _load_sklearn_model(self):
+        """بارگذاری مدل و scaler sklearn (برای آموزش مجدد)"""
+        import joblib
+
+        model_data = joblib.load(self.model_path)
+        self.model = model_data['model']
+        self.scaler = model_data['scaler']
+        self.feature_importance = model_data.get(
+            'feature_importance', {})
+
+    def _export_compiled(self):
+        """ساخت نسخه فشرده از مدل sklearn فعلی و استفاده از آن برای پیش‌بینی"""
+        try:
+            export_forest(self.model, self.scaler, self.compiled_path,
+                          self.feature_importance)
+            self.compiled = CompiledForest.load(self.compiled_path)
+        except Exception as e:
+            logger.error(f"❌ خطا در ساخت مدل فشرده: {e}")
+            self.compiled = None
+
     def _create_new_model(self):
         """ایجاد مدل جدید با داده‌های نمونه"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+
         logger.info("🧠 آموزش مدل جدید...")
+        self.scaler = StandardScaler()
 
-        # تولید داده‌های نمونه برای آموزش
-        training_data = self._generate_training_data()
+        if len(self.reservoir) >= self.training_config['min_rows']:
+            # نتایج واقعی تست‌ها به جای داده‌های نمونه
+            X, y = self.reservoir.snapshot()
+        else:
+            # تولید داده‌های نمونه برای آموزش
+            training_data = self._generate_training_data()
 
-        if len(training_data) < 10:
-            logger.warning(
-                "⚠️ داده‌های آموزشی کافی نیست، استفاده از مدل پیش‌فرض")
-            self._create_default_model()
-            return
+            if len(training_data) < 10:
+                logger.warning(
+                    "⚠️ داده‌های آموزشی کافی نیست، استفاده از مدل پیش‌فرض")
+                self._create_default_model()
+                return
 
-        # استخراج ویژگی‌ها و برچسب‌ها
-        X = np.array([self._extract_features_vector(data['features'])
-                     for data in training_data])
-        y = np.array([data['quality_score'] for data in training_data])
+            # استخراج ویژگی‌ها و برچسب‌ها
+            X = np.array([self._extract_features_vector(data['features'])
+                         for data in training_data])
+            y = np.array([data['quality_score'] for data in training_data])
 
         # تقسیم داده‌ها
         X_train, X_test, y_train, y_test = train_test_split(
@@ -153,7 +211,11 @@ class AIQualityScorer:
 
     def _create_default_model(self):
         """ایجاد مدل پیش‌فرض ساده"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+
         self.model = RandomForestRegressor(n_estimators=10, random_state=42)
+        self.scaler = StandardScaler()
         # آموزش با داده‌های پیش‌فرض
         X_dummy = np.random.rand(50, len(self._get_feature_names()))
         y_dummy = np.random.rand(50)
@@ -313,7 +375,9 @@ class AIQualityScorer:
         ]
 
     def _save_model(self):
-        """ذخیره مدل"""
+        """ذخیره مدل sklearn و نسخه فشرده آن"""
+        import joblib
+
         try:
             model_data = {
                 'model': self.model,
@@ -325,6 +389,7 @@ class AIQualityScorer:
             logger.info(f"💾 مدل در {self.model_path} ذخیره شد")
         except Exception as e:
             logger.error(f"❌ خطا در ذخیره مدل: {e}")
+        self._export_compiled()
 
     def extract_config_features(self, config_data: Dict) -> ConfigFeatures:
         """استخراج ویژگی‌های کانفیگ"""
@@ -343,10 +408,11 @@ class AIQualityScorer:
             elif 'quic' in config_data.get('network', '').lower():
                 network_type = 'quic'
 
-            # تشخیص TLS و Reality
-            has_tls = config_data.get(
-                'tls', False) or 'tls' in str(config_data).lower()
-            has_reality = 'reality' in str(config_data).lower()
+            # تشخیص TLS و Reality (فقط در مقادیر متنی، نه نام کلیدها)
+            text = ' '.join(value for value in config_data.values()
+                            if isinstance(value, str)).lower()
+            has_tls = bool(config_data.get('tls', False)) or 'tls' in text
+            has_reality = 'reality' in text
 
             # تشخیص رمزنگاری
             encryption = config_data.get('encryption', 'auto')
@@ -383,82 +449,89 @@ class AIQualityScorer:
 
     def predict_quality(self, config_data: Dict) -> QualityMetrics:
         """پیش‌بینی کیفیت کانفیگ"""
-        try:
-            # استخراج ویژگی‌ها
-            features = self.extract_config_features(config_data)
-
-            # تبدیل به بردار
-            feature_vector = np.array(
-                [self._extract_features_vector(features)]).reshape(1, -1)
+        return self.predict_quality_batch([config_data])[0]
 
-            # نرمال‌سازی
-            feature_vector_scaled = self.scaler.transform(feature_vector)
+    def predict_quality_batch(self, configs_data: List[Dict]) -> List[QualityMetrics]:
+        """
+        پیش‌بینی کیفیت چند کانفیگ با یک ماتریس ویژگی
 
-            # پیش‌بینی
-            overall_score = self.model.predict(feature_vector_scaled)[0]
-            # محدود کردن به [0,1]
-            overall_score = max(0.0, min(1.0, overall_score))
+        یک transform و یک predict برای کل دسته اجرا می‌شود و متریک‌های
+        تفصیلی روی ستون‌ها محاسبه می‌شوند.
+        """
+        if not configs_data:
+            return []
 
-            # محاسبه متریک‌های جزئی
-            metrics = self._calculate_detailed_metrics(features, overall_score)
+        try:
+            # استخراج ویژگی‌ها و ساخت ماتریس
+            features = [self.extract_config_features(data) for data in configs_data]
+            matrix = np.array([self._extract_features_vector(f) for f in features],
+                              dtype=np.float64)
+
+            # نرمال‌سازی و پیش‌بینی (محدود به [0,1])
+            if self.compiled is not None:
+                scores = self.compiled.predict(matrix)
+            else:
+                scores = self.model.predict(self.scaler.transform(matrix))
+            scores = np.clip(scores, 0.0, 1.0)
 
-            return metrics
+            return self._calculate_detailed_metrics_batch(features, scores)
 
         except Exception as e:
             logger.error(f"❌ خطا در پیش‌بینی کیفیت: {e}")
-            return QualityMetrics()
+            return [QualityMetrics() for _ in configs_data]
 
     def _calculate_detailed_metrics(self, features: ConfigFeatures, overall_score: float) -> QualityMetrics:
         """محاسبه متریک‌های تفصیلی"""
+        return self._calculate_detailed_metrics_batch([features], np.array([overall_score]))[0]
+
+    def _calculate_detailed_metrics_batch(self, features: List[ConfigFeatures],
+                                          overall_scores: np.ndarray) -> List[QualityMetrics]:
+        """محاسبه متریک‌های تفصیلی روی ستون‌های ویژگی"""
+        latency = np.array([f.latency for f in features], dtype=np.float64)
+        uptime = np.array([f.uptime_percentage for f in features], dtype=np.float64)
+        success_rate = np.array([f.success_rate for f in features], dtype=np.float64)
+        has_tls = np.array([bool(f.has_tls) for f in features])
+        has_reality = np.array([bool(f.has_reality) for f in features])
+        protocol = np.array([f.protocol for f in features], dtype=object)
+        encryption = np.array([f.encryption for f in features], dtype=object)
+        network = np.array([f.network_type for f in features], dtype=object)
+
         # امتیاز تأخیر
-        if features.latency <= 50:
-            latency_score = 1.0
-        elif features.latency <= 100:
-            latency_score = 0.8
-        elif features.latency <= 200:
-            latency_score = 0.6
-        elif features.latency <= 500:
-            latency_score = 0.4
-        else:
-            latency_score = 0.2
+        latency_score = np.select(
+            [latency <= 50, latency <= 100, latency <= 200, latency <= 500],
+            [1.0, 0.8, 0.6, 0.4], default=0.2)
 
         # امتیاز پایداری
-        stability_score = features.uptime_percentage / 100.0
-
-        # امتیاز امنیت
-        security_score = 0.3  # پایه
-        if features.has_tls:
-            security_score += 0.3
-        if features.has_reality:
-            security_score += 0.2
-        if features.encryption in ['aes-256-gcm', 'chacha20-poly1305']:
-            security_score += 0.2
-
-        # امتیاز عملکرد
-        performance_score = 0.5  # پایه
-        if features.protocol in ['vless', 'trojan']:
-            performance_score += 0.3
-        elif features.protocol == 'vmess':
-            performance_score += 0.2
-        if features.network_type in ['grpc', 'quic']:
-            performance_score += 0.2
-
-        # امتیاز قابلیت اطمینان
-        reliability_score = features.success_rate
+        stability_score = uptime / 100.0
+
+        # امتیاز امنیت (پایه 0.3)
+        security_score = (0.3 + 0.3 * has_tls + 0.2 * has_reality
+                          + 0.2 * np.isin(encryption, ['aes-256-gcm', 'chacha20-poly1305']))
+
+        # امتیاز عملکرد (پایه 0.5)
+        performance_score = (0.5
+                             + np.where(np.isin(protocol, ['vless', 'trojan']), 0.3,
+                                        np.where(protocol == 'vmess', 0.2, 0.0))
+                             + 0.2 * np.isin(network, ['grpc', 'quic']))
 
         # سطح اطمینان
-        confidence_level = min(1.0, len([f for f in [
-                               features.latency, features.uptime_percentage, features.success_rate] if f > 0]) / 3.0)
-
-        return QualityMetrics(
-            latency_score=latency_score,
-            stability_score=stability_score,
-            security_score=security_score,
-            performance_score=performance_score,
-            reliability_score=reliability_score,
-            overall_score=overall_score,
-            confidence_level=confidence_level
-        )
+        confidence_level = np.minimum(
+            1.0, ((latency > 0).astype(np.float64) + (uptime > 0) + (success_rate > 0)) / 3.0)
+
+        return [
+            QualityMetrics(
+                latency_score=row[0],
+                stability_score=row[1],
+                security_score=row[2],
+                performance_score=row[3],
+                reliability_score=row[4],
+                overall_score=row[5],
+                confidence_level=row[6]
+            )
+            for row in np.column_stack([
+                latency_score, stability_score, security_score, performance_score,
+                success_rate, overall_scores, confidence_level]).tolist()
+        ]
 
     def get_quality_category(self, score: float) -> str:
         """دریافت دسته‌بندی کیفیت"""
@@ -475,46 +548,102 @@ class AIQualityScorer:
         """دریافت اهمیت ویژگی‌ها"""
         return self.feature_importance.copy()
 
-    def retrain_model(self, new_data: List[Dict]):
-        """بازآموزی مدل با داده‌های جدید"""
-        logger.info("🔄 شروع بازآموزی مدل...")
+    def record_outcomes(self, keys: List[str], configs_data: List[Dict]) -> int:
+        """
+        ثبت نتیجه واقعی تست کانفیگ‌ها در reservoir آموزشی
+
+        برچسب ردیف ویژگی هر کانفیگ، success_rate تست بعدی همان کانفیگ است.
+
+        Args:
+            keys: کلید هویت هر کانفیگ
+            configs_data: داده‌های کانفیگ (مانند ورودی predict_quality_batch)
+
+        Returns:
+            تعداد ردیف‌های برچسب‌دار جدید
+        """
+        rows = [self._extract_features_vector(self.extract_config_features(data))
+                for data in configs_data]
+        outcomes = [float(data.get('success_rate', 0.0)) for data in configs_data]
+        return self.reservoir.observe(keys, rows, outcomes)
+
+    def update_model(self) -> bool:
+        """
+        به‌روزرسانی تدریجی مدل با reservoir
+
+        trees_per_update درخت جدید روی ردیف‌های reservoir (حداکثر
+        reservoir_size ردیف) آموزش داده و به جنگل اضافه می‌شوند و
+        قدیمی‌ترین درخت‌ها تا max_trees حذف می‌شوند؛ scaler ثابت می‌ماند تا
+        درخت‌های قبلی معتبر بمانند. مدل جدید پس از ساخت جایگزین می‌شود، پس
+        اجرا در thread پس‌زمینه با پیش‌بینی همزمان تداخل ندارد.
+        """
+        if not self._training_lock.acquire(blocking=False):
+            logger.info("⏳ به‌روزرسانی مدل در حال اجراست")
+            return False
 
         try:
-            # استخراج ویژگی‌ها از داده‌های جدید
-            X_new = []
-            y_new = []
+            from sklearn.ensemble import RandomForestRegressor
 
-            for data in new_data:
-                features = self.extract_config_features(data['config'])
-                quality_score = data.get('quality_score', 0.5)
-
-                X_new.append(self._extract_features_vector(features))
-                y_new.append(quality_score)
-
-            if len(X_new) < 5:
-                logger.warning("⚠️ داده‌های جدید کافی نیست")
+            X, y = self.reservoir.snapshot()
+            if len(y) < self.training_config['min_rows']:
+                logger.info(
+                    f"⚠️ داده‌های واقعی کافی نیست ({len(y)}/{self.training_config['min_rows']})")
                 return False
 
-            # ترکیب با داده‌های موجود
-            X_new = np.array(X_new)
-            y_new = np.array(y_new)
-
-            # نرمال‌سازی
-            X_new_scaled = self.scaler.transform(X_new)
-
-            # بازآموزی مدل
-            self.model.fit(X_new_scaled, y_new)
-
-            # ذخیره مدل جدید
+            start = time.time()
+            if self.model is None:
+                if not os.path.exists(self.model_path):
+                    # فقط مدل فشرده موجود است: ساخت جنگل کامل روی نتایج واقعی
+                    self._create_new_model()
+                    return True
+                self._load_sklearn_model()
+
+            update = RandomForestRegressor(
+                n_estimators=self.training_config['trees_per_update'],
+                max_depth=10,
+                random_state=self.reservoir.seen % (2 ** 32),
+                n_jobs=1
+            )
+            update.fit(self.scaler.transform(X), y)
+
+            model = copy.copy(self.model)
+            model.estimators_ = (list(self.model.estimators_) + update.estimators_)[
+                -self.training_config['max_trees']:]
+            model.n_estimators = len(model.estimators_)
+
+            self.model = model
+            self.feature_importance = dict(zip(
+                self._get_feature_names(),
+                model.feature_importances_
+            ))
             self._save_model()
 
-            logger.info("✅ مدل با موفقیت بازآموزی شد")
+            logger.info(
+                f"✅ مدل با {len(update.estimators_)} درخت جدید روی {len(y)} نتیجه واقعی "
+                f"به‌روزرسانی شد ({time.time() - start:.1f}s)")
             return True
 
+        except Exception as e:
+            logger.error(f"❌ خطا در به‌روزرسانی مدل: {e}")
+            return False
+        finally:
+            self._training_lock.release()
+
+    def retrain_model(self, new_data: List[Dict]):
+        """بازآموزی مدل با داده‌های جدید (افزودن به reservoir و به‌روزرسانی تدریجی)"""
+        logger.info("🔄 شروع بازآموزی مدل...")
+
+        try:
+            for data in new_data:
+                features = self.extract_config_features(data['config'])
+                self.reservoir.add(self._extract_features_vector(features),
+                                   data.get('quality_score', 0.5))
+            self.reservoir.save()
         except Exception as e:
             logger.error(f"❌ خطا در بازآموزی مدل: {e}")
             return False
 
+        return self.update_model()
+
 
 # نمونه استفاده
 if __name__ == "__main__":
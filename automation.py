@@ -11,6 +11,7 @@ import asyncio
 import logging
 import os
 import json
+import threading
 from datetime import datetime
 from config_collector import V2RayCollector
 
@@ -32,6 +33,8 @@ class AutomationManager:
     def __init__(self):
         self.collector = V2RayCollector()
         self.is_running = False
+        # به‌روزرسانی مدل AI در پس‌زمینه (حداکثر یکی در هر زمان)
+        self.model_update_thread = None
         self.stats = {
             'total_runs': 0,
             'successful_runs': 0,
@@ -74,6 +77,14 @@ class AutomationManager:
             # تولید گزارش
             report = self.collector.generate_report()
 
+            # وضعیت زمان‌بندی منابع برای سیکل بعد
+            if self.collector.source_scheduler:
+                schedule_summary = self.collector.source_scheduler.summary()
+                self.stats['source_schedule'] = schedule_summary
+                logger.info(
+                    f"📅 منابع: {schedule_summary['fetched_last_cycle']} دریافت شده، "
+                    f"{schedule_summary['quarantined']} قرنطینه")
+
             # ذخیره گزارش با timestamp
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             report_filename = f'subscriptions/report_{timestamp}.json'
@@ -92,6 +103,9 @@ class AutomationManager:
             # ذخیره آمار
             self.save_stats()
 
+            # آموزش تدریجی مدل AI با نتایج این سیکل
+            self.schedule_model_update()
+
             return True
 
         except Exception as e:
@@ -100,6 +114,26 @@ class AutomationManager:
             self.save_stats()
             return False
 
+    def schedule_model_update(self):
+        """اجرای به‌روزرسانی مدل AI در thread پس‌زمینه تا سیکل بعد منتظر آموزش نماند"""
+        scorer = self.collector.ai_scorer
+        if not scorer:
+            return
+        if self.model_update_thread and self.model_update_thread.is_alive():
+            logger.info("⏳ به‌روزرسانی قبلی مدل AI هنوز در حال اجراست")
+            return
+
+        self.model_update_thread = threading.Thread(
+            target=scorer.update_model, name='ai-model-update', daemon=True)
+        self.model_update_thread.start()
+        logger.info("🧠 به‌روزرسانی مدل AI در پس‌زمینه شروع شد")
+
+    def wait_for_model_update(self):
+        """انتظار برای پایان به‌روزرسانی مدل پیش از خروج"""
+        if self.model_update_thread and self.model_update_thread.is_alive():
+            logger.info("⏳ انتظار برای پایان به‌روزرسانی مدل AI...")
+            self.model_update_thread.join()
+
     def setup_schedule(self):
         """تنظیم زمان‌بندی کارها"""
 
@@ -229,6 +263,7 @@ class AutomationManager:
             logger.error(f"خطای کلی در اتوماسیون: {e}")
         finally:
             self.save_stats()
+            self.wait_for_model_update()
             logger.info("💾 آمار نهایی ذخیره شد")
 
     def run_once(self):
@@ -237,6 +272,7 @@ class AutomationManager:
 
         try:
             asyncio.run(self.run_collection_job())
+            self.wait_for_model_update()
             logger.info("✅ اجرای یکباره با موفقیت انجام شد")
         except Exception as e:
             logger.error(f"❌ خطا در اجرای یکباره: {e}")
@@ -32,6 +32,8 @@ class CacheManager:
         self.cache_dir = cache_dir
         self.max_size = max_size
         self.memory_cache: Dict[str, CacheEntry] = {}
+        self.source_validators: Dict[str, Dict[str, Any]] = {}
+        self.validators_file = os.path.join(cache_dir, "source_validators.json")
         self.cache_stats = {
             'hits': 0,
             'misses': 0,
@@ -44,6 +46,7 @@ class CacheManager:
         
         # بارگذاری کش از فایل
         self._load_cache_from_disk()
+        self._load_source_validators()
         
         logger.info(f"Cache Manager initialized with {len(self.memory_cache)} entries")
     
@@ -222,6 +225,46 @@ class CacheManager:
         except Exception as e:
             logger.error(f"Error saving cache to disk: {e}")
     
+    def _load_source_validators(self):
+        """بارگذاری ETag/Last-Modified منابع از دیسک"""
+        if not os.path.exists(self.validators_file):
+            return
+        
+        try:
+            with open(self.validators_file, 'r', encoding='utf-8') as f:
+                self.source_validators = json.load(f)
+            logger.info(f"Loaded validators for {len(self.source_validators)} sources")
+        except Exception as e:
+            logger.error(f"Error loading source validators: {e}")
+            self.source_validators = {}
+    
+    def get_source_validators(self, source_url: str) -> Optional[Dict[str, Any]]:
+        """دریافت ETag، Last-Modified، hash محتوا و کانفیگ‌های تجزیه شده یک منبع"""
+        return self.source_validators.get(source_url)
+    
+    def set_source_validators(self, source_url: str, etag: Optional[str],
+                              last_modified: Optional[str], content_hash: str,
+                              configs: List[str]) -> None:
+        """ذخیره اعتبارسنج‌های HTTP و نتیجه تجزیه یک منبع"""
+        self.source_validators[source_url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+            'configs': configs,
+            'updated_at': time.time()
+        }
+    
+    def save_source_validators(self):
+        """ذخیره اعتبارسنج‌های منابع روی دیسک"""
+        try:
+            with open(self.validators_file, 'w', encoding='utf-8') as f:
+                json.dump(self.source_validators, f, ensure_ascii=False)
+            
+            logger.info(f"Saved validators for {len(self.source_validators)} sources")
+            
+        except Exception as e:
+            logger.error(f"Error saving source validators: {e}")
+    
     def get_or_set(self, key: str, factory_func, ttl: int = 3600) -> Any:
         """دریافت از کش یا تولید و ذخیره"""
         cached_data = self.get(key)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Collection Pipeline
+خط لوله تولیدکننده/مصرف‌کننده برای همپوشانی دریافت، تجزیه، فیلتر و تست کانفیگ‌ها
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from config_dedup import DedupEngine
+
+logger = logging.getLogger(__name__)
+
+# نشانگر پایان جریان در صف‌ها
+_DONE = object()
+
+
+class CollectionPipeline:
+    """
+    اجرای یک سیکل جمع‌آوری به صورت خط لوله
+
+    مراحل دریافت → تجزیه/حذف تکراری → فیلتر → تست با صف‌های محدود به هم
+    متصل هستند؛ پر شدن هر صف مرحله قبلی را متوقف می‌کند (backpressure) و تست
+    کانفیگ‌های منابع سریع پیش از پایان دانلود منابع کند شروع می‌شود.
+    """
+
+    def __init__(self, collector):
+        options = collector.optimization_config
+        queue_size = options.get('pipeline_queue_size', 32)
+
+        self.collector = collector
+        self.test_batch_size = options.get('pipeline_test_batch_size', 200)
+        self.test_workers = max(1, options.get('pipeline_test_workers', 4))
+
+        self.raw_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.test_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        self._start_time = 0.0
+        self.stats: Dict[str, Any] = {
+            'received': 0,
+            'duplicates': 0,
+            'dedup': {},
+            'unparsable': 0,
+            'filtered': 0,
+            'tested': 0,
+            'working': 0,
+            'fetch_seconds': 0.0,
+            'first_test_after_seconds': None,
+            'total_seconds': 0.0,
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """اجرای تمام مراحل خط لوله و بازگرداندن آمار"""
+        self._start_time = time.time()
+        working_before = len(self.collector.working_configs)
+        logger.info("🚀 شروع خط لوله دریافت/تجزیه/تست...")
+
+        stages = [self._fetch_stage(), self._parse_stage(), self._filter_stage()]
+        stages += [self._test_stage() for _ in range(self.test_workers)]
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        self.stats['working'] = len(
+            self.collector.working_configs) - working_before
+        self.stats['total_seconds'] = round(time.time() - self._start_time, 2)
+        self._log_summary()
+        return self.stats
+
+    async def _fetch_stage(self):
+        """مرحله دریافت: ارسال دسته‌های خام هر منبع به محض رسیدن"""
+
+        async def consume(source: str, batch: List[str]):
+            self.stats['received'] += len(batch)
+            await self.raw_queue.put(batch)
+
+        try:
+            await self.collector.run_fetch_phase(consume)
+        finally:
+            self.stats['fetch_seconds'] = round(
+                time.time() - self._start_time, 2)
+            await self.raw_queue.put(_DONE)
+
+    async def _parse_stage(self):
+        """مرحله تجزیه: حذف تکراری‌ها (رشته و آدرس سرور) و تبدیل به V2RayConfig"""
+        dedup = DedupEngine()
+        parser = self.collector.parallel_parser
+        # دسته‌های منتظر در صف با هم تجزیه می‌شوند تا بین workerها پخش شوند
+        gather_limit = parser.chunk_size * parser.workers
+
+        try:
+            finished = False
+            while not finished:
+                batch = await self.raw_queue.get()
+                if batch is _DONE:
+                    break
+
+                fresh: List[str] = []
+                while True:
+                    for config_str in batch:
+                        if config_str and dedup.is_new_raw(config_str):
+                            fresh.append(config_str)
+
+                    if len(fresh) >= gather_limit or self.raw_queue.empty():
+                        break
+                    batch = self.raw_queue.get_nowait()
+                    if batch is _DONE:
+                        finished = True
+                        break
+
+                parsed = []
+                configs = await self.collector.parse_configs(fresh)
+                for config_str, config in zip(fresh, configs):
+                    if not config:
+                        self.stats['unparsable'] += 1
+                    elif dedup.is_new_config(config_str, config):
+                        parsed.append(config)
+
+                self.stats['duplicates'] = dedup.duplicates
+                if parsed:
+                    await self.parsed_queue.put(parsed)
+        finally:
+            self.stats['duplicates'] = dedup.duplicates
+            self.stats['dedup'] = dict(dedup.merged)
+            self.collector.dedup_stats = dedup.summary()
+            await self.parsed_queue.put(_DONE)
+
+    async def _filter_stage(self):
+        """مرحله فیلتر: حذف کانفیگ‌های نامعتبر و تشکیل دسته‌های تست"""
+        smart_filter = self.collector.smart_filter
+        pending = []
+
+        try:
+            while True:
+                batch = await self.parsed_queue.get()
+                if batch is _DONE:
+                    break
+
+                for config in batch:
+                    if smart_filter.is_valid_config(config):
+                        pending.append(config)
+                    else:
+                        self.stats['filtered'] += 1
+
+                # دسته کامل یا صف خالی: ارسال فوری تا tester بیکار نماند
+                while len(pending) >= self.test_batch_size:
+                    await self.test_queue.put(pending[:self.test_batch_size])
+                    pending = pending[self.test_batch_size:]
+                if pending and self.parsed_queue.empty():
+                    await self.test_queue.put(pending)
+                    pending = []
+
+            if pending:
+                await self.test_queue.put(pending)
+        finally:
+            for _ in range(self.test_workers):
+                await self.test_queue.put(_DONE)
+
+    async def _test_stage(self):
+        """مرحله تست: مصرف دسته‌ها و ثبت نتایج در collector"""
+        while True:
+            batch = await self.test_queue.get()
+            if batch is _DONE:
+                break
+
+            if self.stats['first_test_after_seconds'] is None:
+                self.stats['first_test_after_seconds'] = round(
+                    time.time() - self._start_time, 2)
+
+            await self.collector.test_config_batch(batch)
+            self.stats['tested'] += len(batch)
+
+    def _log_summary(self):
+        """گزارش نهایی خط لوله"""
+        stats = self.stats
+        success_rate = (stats['working'] / stats['tested']
+                        * 100) if stats['tested'] else 0
+        logger.info("🎉 خط لوله کامل شد:")
+        logger.info(f"   ⏱️ زمان کل: {stats['total_seconds']:.1f}s")
+        logger.info(f"   🌐 زمان دریافت: {stats['fetch_seconds']:.1f}s")
+        if stats['first_test_after_seconds'] is not None:
+            logger.info(
+                f"   🧪 شروع اولین تست پس از: {stats['first_test_after_seconds']:.1f}s")
+        logger.info(
+            f"   🔄 دریافتی: {stats['received']} - تکراری: {stats['duplicates']} - "
+            f"نامعتبر: {stats['unparsable'] + stats['filtered']}")
+        if stats['dedup']:
+            logger.info(
+                f"   🧬 ادغام: یکسان {stats['dedup']['exact']}، فقط نام {stats['dedup']['remark']}، "
+                f"معادل {stats['dedup']['equivalent']}")
+        logger.info(
+            f"   ✅ موفق: {stats['working']}/{stats['tested']} ({success_rate:.1f}%)")
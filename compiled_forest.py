@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled Forest
+خروجی فشرده NumPy از RandomForestRegressor آموزش دیده و پیش‌بینی دسته‌ای بدون sklearn
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# تعداد سطر هر مرحله پیمایش تا آرایه‌های میانی (سطر × درخت) کوچک بمانند
+CHUNK_ROWS = 4096
+
+
+def compiled_path_for(model_path: str) -> str:
+    """مسیر فایل فشرده کنار فایل مدل sklearn"""
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def export_forest(model, scaler, path: str,
+                  feature_importance: Optional[Dict[str, float]] = None):
+    """
+    تبدیل جنگل و scaler آموزش دیده به آرایه‌های گره و ذخیره در فایل npz
+
+    گره‌های تمام درخت‌ها پشت سر هم قرار می‌گیرند؛ فرزندان برگ‌ها به خود
+    برگ اشاره می‌کنند تا پیمایش با تعداد گام ثابت (عمق بیشینه) انجام شود.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left < 0
+
+        roots.append(offset)
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+        rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+        values.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+        depth = max(depth, tree.max_depth)
+
+    importance = feature_importance or {}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        np.savez(
+            f,
+            version=np.int32(FORMAT_VERSION),
+            depth=np.int32(depth),
+            roots=np.array(roots, dtype=np.int32),
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            scaler_mean=np.asarray(scaler.mean_, dtype=np.float64),
+            scaler_scale=np.asarray(scaler.scale_, dtype=np.float64),
+            importance_names=np.array(list(importance.keys()), dtype=str),
+            importance_values=np.array(list(importance.values()), dtype=np.float64),
+        )
+    logger.info(f"📦 مدل فشرده ({offset} گره، {len(roots)} درخت) در {path} ذخیره شد")
+
+
+class CompiledForest:
+    """
+    پیش‌بینی جنگل تصادفی فقط با NumPy
+
+    برای هر دسته سطر، تمام درخت‌ها همزمان و سطح به سطح پیمایش می‌شوند.
+    مقایسه‌ها مانند sklearn روی ویژگی‌های float32 انجام می‌شود تا نتایج
+    با مدل اصلی یکسان باشند. فایل بدون pickle بارگذاری می‌شود.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        if int(arrays['version']) != FORMAT_VERSION:
+            raise ValueError(f"نسخه فایل مدل فشرده پشتیبانی نمی‌شود: {int(arrays['version'])}")
+        self.depth = int(arrays['depth'])
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.mean = arrays['scaler_mean']
+        self.scale = arrays['scaler_scale']
+        self.feature_importance = dict(zip(
+            arrays['importance_names'].tolist(), arrays['importance_values'].tolist()))
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """معادل StandardScaler.transform"""
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def predict_scaled(self, X: np.ndarray) -> np.ndarray:
+        """پیش‌بینی برای ویژگی‌های نرمال شده (معادل model.predict)"""
+        X = np.asarray(X, dtype=np.float32)
+        predictions: List[np.ndarray] = []
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            rows = np.arange(len(chunk))[:, None]
+            nodes = np.broadcast_to(self.roots, (len(chunk), self.n_trees))
+            for _ in range(self.depth):
+                go_left = chunk[rows, self.feature[nodes]] <= self.threshold[nodes]
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            predictions.append(self.value[nodes].mean(axis=1))
+        return np.concatenate(predictions) if predictions else np.empty(0)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """پیش‌بینی برای بردارهای ویژگی خام"""
+        return self.predict_scaled(self.transform(X))
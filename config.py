@@ -195,6 +195,74 @@ AUTOMATION_CONFIG = {
     'weekly_report_hour': 8,  # ساعت گزارش هفتگی
 }
 
+# تنظیمات زمان‌بندی تطبیقی منابع
+SOURCE_SCHEDULER_CONFIG = {
+    'enabled': True,
+    'stats_file': 'cache/source_stats.json',  # آمار دریافت منابع بین اجراها
+    'high_yield_ratio': 0.05,  # نسبت کانفیگ سالم برای دریافت در هر سیکل
+    'max_backoff_cycles': 8,  # حداکثر فاصله دریافت منابع کم‌بازده (سیکل)
+    'unchanged_backoff_cycles': 2,  # فاصله دریافت منابع بدون تغییر (سیکل)
+    'quarantine_after_failures': 5,  # قرنطینه پس از این تعداد خطای متوالی
+    'quarantine_hours': 12,  # مدت قرنطینه منابع از کار افتاده
+    'min_timeout': 5,  # حداقل timeout دریافت (ثانیه)
+    'max_timeout': 30,  # حداکثر timeout دریافت (ثانیه)
+    'timeout_latency_factor': 4,  # ضریب تأخیر تاریخی برای timeout
+}
+
+# تنظیمات فهرست دائمی نتیجه تست کانفیگ‌ها
+SEEN_INDEX_CONFIG = {
+    'enabled': True,
+    'index_file': 'cache/seen_index.json',
+    'fresh_working_minutes': 60,  # مدت تازه ماندن نتیجه کانفیگ سالم
+    'fresh_failed_minutes': 120,  # مدت تازه ماندن نتیجه کانفیگ خراب
+    'max_streak_multiplier': 4,  # ضریب حداکثر تازگی برای نتایج تکراری متوالی
+    'max_entry_age_hours': 72,  # حذف ورودی‌هایی که این مدت تست نشده‌اند
+    'max_sources': 3,  # تعداد منابع ثبت شده برای هر کانفیگ
+}
+
+# تنظیمات قیف تست مرحله‌ای (TCP ← TLS ← handshake پروتکل)
+PROBE_FUNNEL_CONFIG = {
+    'enabled': True,
+    'tcp_budget_seconds': 900,  # بودجه زمانی مرحله TCP در کل سیکل
+    'tls_concurrency': 500,  # حداکثر handshake TLS همزمان
+    'tls_timeout': 3.0,
+    'tls_budget_seconds': 300,
+    'protocol_concurrency': 100,  # حداکثر handshake پروتکل همزمان
+    'protocol_timeout': 5.0,
+    'protocol_budget_seconds': 300,
+    'protocol_top_n': 5,  # تعداد کانفیگ برتر هر (پروتکل، کشور) در هر سیکل برای تست پروتکل
+    'drop_unverified': False,  # حذف کانفیگ‌هایی که handshake پروتکل را رد می‌کنند
+}
+
+# تنظیمات زمان‌بندی تست (سهمیه‌ها از CATEGORIZATION_CONFIG و GEO_FILTER_CONFIG)
+PROBE_SCHEDULER_CONFIG = {
+    'enabled': True,
+    'cycle_deadline_seconds': 1500,  # مهلت کل تست در هر سیکل
+    'quota_headroom': 1.25,  # تست تا سهمیه × این ضریب کانفیگ سالم برای انتخاب بر اساس تأخیر
+    'apply_geo_filter': False,  # رد کردن کشورهای مسدود و سهمیه هر کشور GEO_FILTER_CONFIG پیش از تست (خروجی را تغییر می‌دهد)
+}
+
+# تاریخچه نتایج تست هر کانفیگ (لاگ دودویی افزایشی + snapshot)
+FEATURE_STORE_CONFIG = {
+    'enabled': True,
+    'log_file': 'cache/feature_store.log',
+    'snapshot_file': 'cache/feature_store.npz',
+    'latency_alpha': 0.3,  # ضریب EWMA تأخیر
+    'compact_records': 200000,  # فشرده‌سازی لاگ پس از این تعداد رکورد
+    'max_age_days': 14,  # حذف کانفیگ‌های دیده نشده هنگام فشرده‌سازی
+}
+
+# آموزش تدریجی مدل کیفیت AI با نتایج واقعی تست‌ها
+AI_TRAINING_CONFIG = {
+    'enabled': True,
+    'reservoir_file': 'models/training_reservoir.npz',
+    'reservoir_size': 20000,  # حداکثر ردیف برچسب‌دار (سقف هزینه آموزش هر به‌روزرسانی)
+    'max_pending': 50000,  # ردیف‌های منتظر نتیجه تست بعدی
+    'min_rows': 200,  # حداقل ردیف برچسب‌دار برای به‌روزرسانی مدل
+    'trees_per_update': 10,  # درخت‌های جدید در هر به‌روزرسانی
+    'max_trees': 100,  # اندازه جنگل (قدیمی‌ترین درخت‌ها حذف می‌شوند)
+}
+
 # تنظیمات سرور وب
 WEB_SERVER_CONFIG = {
     'host': '0.0.0.0',
@@ -397,6 +465,34 @@ OPTIMIZATION_CONFIG = {
     'enable_connection_pooling': True,
     'max_connections': 100,
     'connection_timeout': 10,
+    'max_connections_per_host': 8,  # حداکثر اتصال همزمان به هر میزبان
+    'dns_cache_ttl_seconds': 300,  # مدت نگهداری DNS در کش aiohttp و resolver تست‌ها
+    'keepalive_timeout': 30,  # نگهداری اتصال‌های idle در pool (ثانیه)
+    'max_concurrent_fetches': 16,  # حداکثر دریافت همزمان از منابع
+    'stream_chunk_size': 64 * 1024,  # اندازه chunk در دریافت جریانی (بایت)
+    'stream_read_timeout': 30,  # حداکثر فاصله بین دو خواندن از شبکه در دریافت جریانی (ثانیه)
+    'enable_pipeline': True,  # همپوشانی دریافت، تجزیه و تست در خط لوله
+    'pipeline_queue_size': 32,  # ظرفیت صف بین مراحل خط لوله (دسته)
+    'pipeline_test_batch_size': 200,  # اندازه دسته ارسالی به مرحله تست
+    'pipeline_test_workers': 4,  # تعداد مصرف‌کننده‌های همزمان مرحله تست
+    'probe_concurrency': 2000,  # حداکثر تست اتصال همزمان (محدود به حد file descriptor)
+    'adaptive_concurrency': True,  # تنظیم خودکار پنجره همزمانی (AIMD) بر اساس خطاها و تأخیر loop
+    'probe_initial_concurrency': 256,  # پنجره اولیه در حالت تطبیقی
+    'probe_timeout': 2.0,  # timeout تست اتصال TCP (ثانیه)
+    'probe_tls_timeout': 3.0,  # timeout مرحله handshake TLS
+    'probe_first_byte_timeout': 3.0,  # timeout انتظار برای اولین بایت پاسخ
+    'latency_samples': 3,  # تعداد نمونه اتصال به هر endpoint (میانه، p90، jitter و loss)
+    'latency_sample_interval': 0.2,  # فاصله بین نمونه‌ها (ثانیه)
+    'dns_negative_ttl_seconds': 60,  # کش hostname‌هایی که resolve نشدند
+    'dns_concurrency': 256,  # حداکثر resolve همزمان
+    'dns_timeout': 3.0,  # timeout هر resolve (ثانیه)
+    'dns_cache_max_hosts': 10000,  # حداکثر hostname در کش resolver (LRU)
+    'parse_workers': 0,  # تعداد پردازه‌های تجزیه موازی (0 = تعداد هسته‌های CPU)
+    'parse_chunk_size': 1000,  # تعداد کانفیگ در هر chunk ارسالی به worker
+    'parallel_parse_threshold': 2000,  # حداقل اندازه دسته برای تجزیه موازی
+    'enable_parse_cache': True,  # ذخیره نتیجه تجزیه کانفیگ‌ها بین سیکل‌ها
+    'parse_cache_file': 'cache/parse_cache.json',
+    'parse_cache_max_idle_cycles': 3,  # حذف ورودی‌هایی که این تعداد سیکل دیده نشده‌اند
 }
 
 # تنظیمات پروفایل‌های مختلف
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Config Dedup Engine
+حذف تکراری کانفیگ‌ها بر اساس هویت استاندارد هر پروتکل
+"""
+
+import hashlib
+from collections import Counter
+from typing import Dict, Tuple
+
+# نام‌های مستعار پروتکل‌ها
+PROTOCOL_ALIASES = {
+    'shadowsocks': 'ss',
+    'shadowsocksr': 'ssr',
+    'hy2': 'hysteria',
+    'hysteria2': 'hysteria',
+}
+
+# فیلدهایی که علاوه بر host/port هویت یک endpoint را در هر پروتکل تعیین می‌کنند
+# (remark و ترتیب پارامترها و padding در Base64 در هویت نقشی ندارند)
+IDENTITY_FIELDS = {
+    'vmess': ('uuid', 'network', 'tls', 'path', 'sni'),
+    'vless': ('uuid', 'network', 'security', 'sni', 'flow', 'path'),
+    'trojan': ('uuid', 'network', 'sni', 'path'),
+    'ss': ('uuid',),
+    'ssr': ('uuid',),
+}
+DEFAULT_IDENTITY_FIELDS = ('uuid',)
+
+# جداکننده فیلدهای هویت در رشته ورودی hash (در مقادیر لینک‌ها نمی‌آید)
+IDENTITY_SEPARATOR = '\x1f'
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def config_identity(config) -> Tuple:
+    """
+    هویت استاندارد یک کانفیگ تجزیه شده
+
+    Returns:
+        (پروتکل، host، port، ...فیلدهای هویت پروتکل)
+    """
+    protocol = config.protocol.lower()
+    protocol = PROTOCOL_ALIASES.get(protocol, protocol)
+    host = config.address.strip().strip('[]').lower().rstrip('.')
+
+    identity = [protocol, host, int(config.port)]
+    for field in IDENTITY_FIELDS.get(protocol, DEFAULT_IDENTITY_FIELDS):
+        value = getattr(config, field)
+        # uuid/password و path حساس به حروف هستند
+        identity.append(value if field in ('uuid', 'path') else _normalize(value))
+    return tuple(identity)
+
+
+def hash64(text: str) -> int:
+    """
+    hash پایدار ۶۴ بیتی (بین اجراها ثابت، برخلاف hash داخلی پایتون)
+
+    کتابخانه استاندارد hash غیررمزنگاری ۶۴ بیتی ندارد؛ blake2b با خروجی
+    ۸ بایتی در C اجرا می‌شود و از پیاده‌سازی پایتونی FNV سریع‌تر است.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def identity_hash(config) -> int:
+    """hash ۶۴ بیتی هویت استاندارد کانفیگ (فیلدها به هم پیوسته با IDENTITY_SEPARATOR)"""
+    return hash64(IDENTITY_SEPARATOR.join(map(str, config_identity(config))))
+
+
+class DedupEngine:
+    """
+    حذف تکراری جریانی در یک گذر
+
+    ابتدا رشته‌های کاملاً یکسان پیش از تجزیه حذف می‌شوند، سپس کانفیگ‌های
+    تجزیه شده با هویت استاندارد مقایسه می‌شوند. دلیل هر ادغام شمارش می‌شود:
+    exact (رشته یکسان)، remark (فقط نام متفاوت) و equivalent (ترتیب پارامترها،
+    padding یا نمایش متفاوت از همان endpoint).
+    """
+
+    REASONS = ('exact', 'remark', 'equivalent')
+
+    def __init__(self):
+        self._raw: set = set()
+        self._bodies: set = set()
+        self._identities: Dict[int, None] = {}
+        self.merged: Counter = Counter({reason: 0 for reason in self.REASONS})
+        self.unique = 0
+
+    def is_new_raw(self, config_str: str) -> bool:
+        """بررسی رشته خام پیش از تجزیه"""
+        if config_str in self._raw:
+            self.merged['exact'] += 1
+            return False
+        self._raw.add(config_str)
+        return True
+
+    def is_new_config(self, config_str: str, config) -> bool:
+        """بررسی کانفیگ تجزیه شده؛ کانفیگ‌های غیرقابل تجزیه حذف نمی‌شوند"""
+        if config is None:
+            self.unique += 1
+            return True
+
+        body_hash = hash64(config_str.split('#', 1)[0])
+        key = identity_hash(config)
+        if key in self._identities:
+            self.merged['remark' if body_hash in self._bodies else 'equivalent'] += 1
+            return False
+
+        self._identities[key] = None
+        self._bodies.add(body_hash)
+        self.unique += 1
+        return True
+
+    def add(self, config_str: str, config) -> bool:
+        """بررسی کامل یک کانفیگ (رشته و هویت)"""
+        return self.is_new_raw(config_str) and self.is_new_config(config_str, config)
+
+    @property
+    def duplicates(self) -> int:
+        return sum(self.merged.values())
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.merged, unique=self.unique, duplicates=self.duplicates)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming Config Ingestion
+دریافت جریانی و خط به خط کانفیگ‌ها از بدنه پاسخ منابع
+"""
+
+import binascii
+import codecs
+import logging
+import re
+from typing import AsyncIterator, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# حداقل داده لازم برای تشخیص نوع بدنه (Base64 یا متن معمولی)
+DETECTION_BYTES = 512
+
+BASE64_ALPHABET = frozenset(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=')
+
+
+def looks_like_base64_body(head: bytes) -> bool:
+    """تشخیص بدنه Base64 تک‌خطی از روی ابتدای پاسخ"""
+    first_line = head.lstrip().split(b'\n', 1)[0].strip()
+    if len(first_line) <= 100:
+        return False
+    if not all(byte in BASE64_ALPHABET for byte in first_line):
+        return False
+
+    # decode یک بلوک کوچک برای اطمینان از اینکه محتوا لینک کانفیگ است
+    sample = first_line[:len(first_line) - len(first_line) % 4][:DETECTION_BYTES]
+    try:
+        decoded = binascii.a2b_base64(sample)
+    except binascii.Error:
+        return False
+    return b'://' in decoded
+
+
+async def prepend_chunks(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """برگرداندن داده‌ی خوانده شده برای تشخیص به ابتدای جریان"""
+    if head:
+        yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+async def read_head(chunks: AsyncIterator[bytes]) -> bytes:
+    """خواندن ابتدای جریان تا رسیدن به حداقل داده لازم برای تشخیص"""
+    head = b''
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= DETECTION_BYTES or b'\n' in head.lstrip():
+            break
+    return head
+
+
+async def iter_text_lines(chunks: AsyncIterator[bytes], hasher=None) -> AsyncIterator[str]:
+    """
+    تبدیل جریان بایت به خطوط متنی
+
+    بدنه‌های Base64 تک‌خطی به صورت تدریجی و در بلوک‌های ۴ بایتی decode می‌شوند،
+    بنابراین حافظه مصرفی متناسب با اندازه chunk است نه اندازه منبع.
+
+    Args:
+        chunks: جریان chunk‌های بدنه پاسخ
+        hasher: شیء hashlib اختیاری؛ هر بایت جریان دقیقاً یک بار به آن داده می‌شود
+
+    Yields:
+        خطوط متنی (بدون کاراکتر newline)
+    """
+    head = await read_head(chunks)
+    is_base64 = looks_like_base64_body(head)
+    if is_base64:
+        logger.debug("Base64 body detected, decoding incrementally")
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    base64_tail = b''
+    pending = ''
+
+    async for chunk in prepend_chunks(head, chunks):
+        if hasher is not None:
+            hasher.update(chunk)
+
+        if is_base64:
+            data = base64_tail + b''.join(chunk.split())
+            cut = len(data) - len(data) % 4
+            base64_tail = data[cut:]
+            chunk = binascii.a2b_base64(data[:cut])
+
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line
+
+    final = b''
+    if is_base64 and base64_tail.rstrip(b'='):
+        final = binascii.a2b_base64(
+            base64_tail + b'=' * (-len(base64_tail) % 4))
+    pending += decoder.decode(final, final=True)
+    if pending:
+        yield pending
+
+
+# تطبیق‌دهنده واحد پیشوند پروتکل‌ها (به جای بررسی جداگانه هر پروتکل)
+PROTOCOL_PREFIX_RE = re.compile(
+    r'(?:vmess|vless|trojan|ssr?|hysteria2?|hy2|tuic|wireguard)://')
+
+
+def decode_base64_text(data: str) -> Optional[str]:
+    """decode یک رشته Base64 به متن؛ در صورت نامعتبر بودن None"""
+    try:
+        return binascii.a2b_base64(data).decode('utf-8')
+    except (binascii.Error, ValueError):
+        return None
+
+
+def classify_lines(lines: Iterable[str]) -> List[str]:
+    """
+    استخراج کانفیگ‌ها از دسته‌ای از خطوط (لینک مستقیم یا Base64)
+
+    JSON لینک‌های vmess اینجا decode نمی‌شود؛ parse_vmess_config فقط برای
+    کانفیگ‌هایی که در memo تجزیه نیستند یک بار آن را decode می‌کند.
+
+    Args:
+        lines: خطوط متنی منبع
+
+    Returns:
+        لیست کانفیگ‌ها به ترتیب خطوط ورودی
+    """
+    configs: List[str] = []
+    has_protocol = PROTOCOL_PREFIX_RE.search
+
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+
+        # اگر خط شامل پروتکل است، مستقیم اضافه کن
+        if has_protocol(line):
+            configs.append(line)
+        # اگر خط بلند است و شبیه Base64، سعی کن decode کنی
+        elif len(line) > 50 and ' ' not in line:
+            decoded = decode_base64_text(line)
+            if decoded is None:
+                # اگر decode نشد، شاید خود لینک باشد
+                configs.append(line)
+                continue
+
+            # ممکن است چند کانفیگ Base64 شده در یک خط باشد
+            for subline in decoded.split('\n'):
+                subline = subline.strip()
+                if subline and has_protocol(subline):
+                    configs.append(subline)
+        else:
+            configs.append(line)
+
+    return configs
+
+
+async def iter_config_batches(chunks: AsyncIterator[bytes], batch_size: int = 500,
+                              hasher=None) -> AsyncIterator[List[str]]:
+    """
+    دریافت جریانی کانفیگ‌ها به صورت دسته‌ای
+
+    Args:
+        chunks: جریان chunk‌های بدنه پاسخ
+        batch_size: تعداد خط در هر دسته
+        hasher: شیء hashlib اختیاری؛ هر بایت جریان دقیقاً یک بار به آن داده می‌شود
+
+    Yields:
+        دسته‌های کانفیگ آماده برای مرحله تجزیه و حذف تکراری
+    """
+    lines: List[str] = []
+    async for line in iter_text_lines(chunks, hasher):
+        lines.append(line)
+        if len(lines) >= batch_size:
+            batch = classify_lines(lines)
+            lines = []
+            if batch:
+                yield batch
+    if lines:
+        batch = classify_lines(lines)
+        if batch:
+            yield batch
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Config Table
+نمای ستونی فشرده از کانفیگ‌ها برای مرتب‌سازی، گروه‌بندی و گزارش
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+
+class ConfigTable:
+    """
+    جدول ستونی کانفیگ‌ها
+
+    پورت، تأخیر، jitter، نرخ از دست رفتن، امتیاز و وضعیت در آرایه‌های typed نگهداری می‌شوند و
+    پروتکل/کشور به صورت کد عددی روی واژگان رشته‌های intern شده. ردیف i
+    متناظر با configs[i] ورودی است.
+    """
+
+    COLUMNS = ('protocol', 'country', 'port', 'latency', 'jitter', 'loss', 'score', 'working')
+
+    def __init__(self):
+        self.protocol_names: List[str] = []
+        self.country_names: List[str] = []
+        self._protocol_codes: Dict[str, int] = {}
+        self._country_codes: Dict[str, int] = {}
+
+        self.protocol = array('H')
+        self.country = array('H')
+        self.port = array('I')
+        self.latency = array('d')
+        self.jitter = array('d')
+        self.loss = array('d')
+        self.score = array('d')
+        self.working = array('b')
+        self.configs: list = []
+
+    @classmethod
+    def from_configs(cls, configs: Iterable) -> 'ConfigTable':
+        table = cls()
+        for config in configs:
+            table.append(config)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    @staticmethod
+    def _encode(value: str, names: List[str], codes: Dict[str, int]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(sys.intern(value))
+        return code
+
+    def append(self, config):
+        """افزودن یک V2RayConfig به جدول"""
+        self.protocol.append(self._encode(
+            config.protocol, self.protocol_names, self._protocol_codes))
+        self.country.append(self._encode(
+            config.country or 'Unknown', self.country_names, self._country_codes))
+        self.port.append(max(0, int(config.port or 0)))
+        self.latency.append(config.latency or 0.0)
+        self.jitter.append(config.jitter or 0.0)
+        self.loss.append(config.loss_ratio or 0.0)
+        self.score.append(config.ai_quality_score or 0.0)
+        self.working.append(1 if config.is_working else 0)
+        self.configs.append(config)
+
+    def values(self, column: str) -> list:
+        """مقادیر یک ستون (پروتکل/کشور به صورت رشته)"""
+        if column == 'protocol':
+            names = self.protocol_names
+            return [names[code] for code in self.protocol]
+        if column == 'country':
+            names = self.country_names
+            return [names[code] for code in self.country]
+        return list(getattr(self, column))
+
+    def group_by(self, column: str) -> Dict[str, List[int]]:
+        """گروه‌بندی اندیس ردیف‌ها بر اساس پروتکل یا کشور"""
+        names = self.protocol_names if column == 'protocol' else self.country_names
+        groups: Dict[str, List[int]] = {}
+        for index, code in enumerate(getattr(self, column)):
+            groups.setdefault(names[code], []).append(index)
+        return groups
+
+    def sorted_indices(self, column: str = 'latency', indices: Optional[List[int]] = None,
+                       reverse: bool = False) -> List[int]:
+        """
+        اندیس ردیف‌ها مرتب شده بر اساس یک ستون عددی
+
+        مرتب‌سازی بر اساس تأخیر ابتدا نرخ از دست رفتن و سپس میانه تأخیر را
+        در نظر می‌گیرد و تأخیر صفر (نامعلوم) در انتها قرار می‌گیرد.
+        """
+        values = getattr(self, column)
+        if indices is None:
+            indices = range(len(values))
+        if column == 'latency':
+            inf = float('inf')
+            loss = self.loss
+            return sorted(indices, key=lambda i: (loss[i], values[i] or inf), reverse=reverse)
+        return sorted(indices, key=values.__getitem__, reverse=reverse)
+
+    def group_stats(self, column: str) -> Dict[str, Dict[str, float]]:
+        """تعداد و میانگین تأخیر، jitter و نرخ از دست رفتن هر گروه"""
+        latency, jitter, loss = self.latency, self.jitter, self.loss
+        stats = {}
+        for name, indices in self.group_by(column).items():
+            count = len(indices)
+            stats[name] = {
+                'count': count,
+                'avg_latency': sum(latency[i] for i in indices) / count,
+                'avg_jitter': sum(jitter[i] for i in indices) / count,
+                'avg_loss': sum(loss[i] for i in indices) / count,
+            }
+        return stats
+
+    def rows(self, indices: Iterable[int]) -> list:
+        """اشیاء V2RayConfig متناظر با اندیس‌ها"""
+        configs = self.configs
+        return [configs[i] for i in indices]
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Async DNS Resolver
+مرحله resolve همزمان hostname‌ها با کش مشترک برای تست کانفیگ‌ها
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+# aiodns (اختیاری) TTL واقعی رکوردها را برمی‌گرداند
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+logger = logging.getLogger(__name__)
+
+
+class DNSResolution:
+    """نتیجه resolve یک hostname"""
+    __slots__ = ('ip', 'latency_ms', 'expires')
+
+    def __init__(self, ip: Optional[str], latency_ms: float, expires: float):
+        self.ip = ip
+        self.latency_ms = latency_ms
+        self.expires = expires
+
+
+class AsyncResolver:
+    """
+    resolve همزمان hostname‌ها با کش TTL
+
+    درخواست‌های همزمان برای یک hostname یکی می‌شوند. با نصب بودن aiodns
+    رکورد A و در نبود آن AAAA پرسیده و از TTL رکورد (حداکثر max_ttl)
+    استفاده می‌شود؛ اگر aiodns پاسخی نداشت یا نصب نبود getaddrinfo
+    غیرمسدودکننده event loop با TTL ثابت. شکست‌ها هم برای negative_ttl
+    ثانیه کش می‌شوند. کش LRU حداکثر max_entries hostname نگه می‌دارد.
+    """
+
+    def __init__(self, ttl: int = 300, max_ttl: int = 3600, negative_ttl: int = 60,
+                 max_concurrency: int = 256, timeout: float = 3.0,
+                 max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_entries = max_entries
+
+        self._cache: 'OrderedDict[str, DNSResolution]' = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphore = None
+        self._loop = None
+        self._dns = None
+        self.stats = {'lookups': 0, 'cache_hits': 0,
+                      'failures': 0, 'lookup_ms': 0.0}
+
+    def _bind_loop(self):
+        # semaphore و aiodns به event loop جاری وابسته‌اند
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+            self._dns = aiodns.DNSResolver(
+                timeout=self.timeout) if aiodns else None
+        return loop
+
+    @staticmethod
+    def is_ip(host: str) -> bool:
+        try:
+            ipaddress.ip_address(host)
+            return True
+        except ValueError:
+            return False
+
+    async def resolve(self, host: str) -> DNSResolution:
+        """resolve یک hostname (یا برگرداندن خود IP)"""
+        if self.is_ip(host):
+            return DNSResolution(host, 0.0, float('inf'))
+
+        loop = self._bind_loop()
+        cached = self._cache.get(host)
+        if cached is not None:
+            if cached.expires > time.monotonic():
+                self._cache.move_to_end(host)
+                self.stats['cache_hits'] += 1
+                return cached
+            del self._cache[host]
+
+        future = self._inflight.get(host)
+        if future is None:
+            future = self._inflight[host] = loop.create_future()
+            try:
+                result = await self._lookup(host)
+                self._store(host, result)
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                del self._inflight[host]
+            return result
+        return await future
+
+    def _store(self, host: str, result: DNSResolution):
+        """افزودن به کش و حذف hostname‌هایی که اخیراً استفاده نشده‌اند"""
+        self._cache[host] = result
+        self._cache.move_to_end(host)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _lookup(self, host: str) -> DNSResolution:
+        async with self._semaphore:
+            self.stats['lookups'] += 1
+            start = time.perf_counter()
+            ip, ttl = None, self.negative_ttl
+            try:
+                ip, ttl = await self._query(host)
+            except (OSError, asyncio.TimeoutError, UnicodeError, ValueError) as e:
+                self.stats['failures'] += 1
+                logger.debug(f"resolve ناموفق {host}: {e}")
+            except Exception as e:  # aiodns.error.DNSError
+                self.stats['failures'] += 1
+                logger.debug(f"resolve ناموفق {host}: {e}")
+
+            latency = (time.perf_counter() - start) * 1000
+            self.stats['lookup_ms'] += latency
+            return DNSResolution(ip, latency, time.monotonic() + ttl)
+
+    async def _query(self, host: str) -> Tuple[Optional[str], float]:
+        if self._dns is not None:
+            # میزبان‌های فقط IPv6 رکورد A ندارند
+            for record_type in ('A', 'AAAA'):
+                try:
+                    records = await asyncio.wait_for(
+                        self._dns.query(host, record_type), self.timeout)
+                except (aiodns.error.DNSError, asyncio.TimeoutError) as e:
+                    logger.debug(f"پرسش {record_type} ناموفق {host}: {e}")
+                    continue
+                if records:
+                    ttl = min(self.max_ttl, max(1, min(r.ttl for r in records)))
+                    return records[0].host, ttl
+
+        # بدون aiodns یا بدون پاسخ از آن: resolver سیستم (شامل /etc/hosts)
+        infos = await asyncio.wait_for(
+            self._loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout)
+        if not infos:
+            return None, self.negative_ttl
+        return infos[0][4][0], self.ttl
+
+    async def resolve_many(self, hosts: Iterable[str]) -> Dict[str, DNSResolution]:
+        """resolve همزمان hostname‌های یکتا"""
+        unique = list(dict.fromkeys(hosts))
+        results = await asyncio.gather(*[self.resolve(host) for host in unique])
+        return dict(zip(unique, results))
+
+    def summary(self) -> Dict[str, float]:
+        stats = dict(self.stats)
+        stats['lookup_ms'] = round(stats['lookup_ms'], 1)
+        stats['cached_hosts'] = len(self._cache)
+        return stats
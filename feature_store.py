@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Feature Store
+تاریخچه فشرده نتایج تست هر کانفیگ (با کلید هویت استاندارد) برای امتیازدهی
+"""
+
+import logging
+import math
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config_dedup import hash64, identity_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEATURE_STORE_CONFIG = {
+    'enabled': True,
+    'log_file': 'cache/feature_store.log',
+    'snapshot_file': 'cache/feature_store.npz',
+    'latency_alpha': 0.3,
+    'compact_records': 200000,
+    'max_age_days': 14,
+}
+
+# رکورد ثابت ۲۵ بایتی لاگ: کلید هویت، زمان، تأخیر، hash منبع و نتیجه
+RECORD_DTYPE = np.dtype([('key', '<u8'), ('time', '<f8'), ('latency', '<f4'),
+                         ('source', '<u4'), ('ok', 'u1')])
+
+# سرآیند لاگ: نسخه فرمت و نسل snapshot ای که لاگ ادامه آن است
+LOG_HEADER = struct.Struct('<4sI')
+LOG_MAGIC = b'FSL1'
+
+# تعداد نتایج اخیر (بیت‌های window) و نمونه‌های تأخیر نگه داشته شده
+WINDOW_BITS = 32
+LATENCY_RING = 8
+
+COLUMNS = {
+    'keys': np.uint64,
+    'tests': np.uint32,
+    'successes': np.uint32,
+    'window': np.uint32,
+    'latency_ewma': np.float32,
+    'first_seen': np.float64,
+    'last_seen': np.float64,
+    'last_success': np.float64,
+    'sources': np.uint64,
+}
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """تعداد بیت‌های یک هر عدد صحیح بی‌علامت"""
+    width = values.dtype.itemsize
+    return np.unpackbits(values.view(np.uint8).reshape(-1, width), axis=1).sum(axis=1)
+
+
+def _nan_percentiles(rows: np.ndarray, percentiles: Sequence[float]) -> List[np.ndarray]:
+    """
+    صدک هر سطر بدون NaN‌ها (درون‌یابی خطی مانند np.nanpercentile)
+
+    np.nanpercentile در axis=1 سطر به سطر اجرا می‌شود؛ اینجا با یک sort
+    (NaN‌ها در انتها) و اندیس‌گذاری برداری محاسبه می‌شود.
+    """
+    ordered = np.sort(rows, axis=1)
+    counts = np.count_nonzero(~np.isnan(rows), axis=1)
+    row_index = np.arange(len(rows))
+    results = []
+    for percentile in percentiles:
+        position = np.maximum(counts - 1, 0) * (percentile / 100.0)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        low_values = ordered[row_index, low]
+        value = low_values + (ordered[row_index, high] - low_values) * (position - low)
+        results.append(np.where(counts > 0, value, np.nan))
+    return results
+
+
+class FeatureStore:
+    """
+    ویژگی‌های تاریخی هر کانفیگ در ستون‌های NumPy
+
+    هر نتیجه تست با O(1) روی ستون‌ها اعمال و در بافر نگه داشته می‌شود؛
+    flush بافر را یکجا به انتهای لاگ دودویی اضافه می‌کند. بارگذاری =
+    snapshot + اجرای مجدد لاگ. وقتی لاگ بزرگ شود compact یک snapshot
+    جدید (بدون ورودی‌های قدیمی) می‌نویسد و لاگ را با نسل جدید از نو شروع
+    می‌کند؛ لاگی که نسلش با snapshot نخواند (قطع پس از نوشتن snapshot)
+    قبلاً در snapshot آمده و نادیده گرفته می‌شود.
+
+    نتایج اخیر به صورت بیت‌های window، تأخیر به صورت EWMA و حلقه آخرین
+    نمونه‌ها (برای صدک‌ها) و تنوع منابع به صورت بیت‌های hash منبع نگه
+    داشته می‌شوند.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULT_FEATURE_STORE_CONFIG)
+        self.config.update(config or {})
+        self.log_file = self.config['log_file']
+        self.snapshot_file = self.config['snapshot_file']
+        self.alpha = self.config['latency_alpha']
+
+        self.size = 0
+        self.generation = 0
+        self.log_records = 0
+        self._slots: Dict[int, int] = {}
+        self._buffer: List[tuple] = []
+        self._allocate(1024)
+        self._load()
+
+    @staticmethod
+    def key_for(config) -> int:
+        return identity_hash(config)
+
+    def _allocate(self, capacity: int):
+        """ایجاد یا بزرگ کردن ستون‌ها"""
+        for name, dtype in COLUMNS.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if name == 'latency_ewma':
+                column[:] = np.nan
+            if hasattr(self, name):
+                column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+        ring = np.full((capacity, LATENCY_RING), np.nan, dtype=np.float32)
+        if hasattr(self, 'latency_ring'):
+            ring[:self.size] = self.latency_ring[:self.size]
+        self.latency_ring = ring
+
+    def _clear(self, start: int, stop: int):
+        """بازنشانی جایگاه‌های آزاد شده به مقادیر اولیه"""
+        for name in COLUMNS:
+            getattr(self, name)[start:stop] = np.nan if name == 'latency_ewma' else 0
+        self.latency_ring[start:stop] = np.nan
+
+    def _slot(self, key: int, timestamp: float) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            if self.size == len(self.keys):
+                self._allocate(2 * len(self.keys))
+            slot = self._slots[key] = self.size
+            self.size += 1
+            self.keys[slot] = key
+            self.first_seen[slot] = timestamp
+        return slot
+
+    def _apply(self, key: int, timestamp: float, latency: float, source: int, ok: int):
+        slot = self._slot(key, timestamp)
+        self.window[slot] = ((int(self.window[slot]) << 1) | ok) & 0xFFFFFFFF
+        if ok:
+            successes = int(self.successes[slot])
+            self.latency_ring[slot, successes % LATENCY_RING] = latency
+            previous = float(self.latency_ewma[slot])
+            self.latency_ewma[slot] = latency if math.isnan(previous) \
+                else previous + self.alpha * (latency - previous)
+            self.successes[slot] = successes + 1
+            self.last_success[slot] = max(self.last_success[slot], timestamp)
+        self.tests[slot] += 1
+        self.last_seen[slot] = max(self.last_seen[slot], timestamp)
+        if source:
+            self.sources[slot] |= np.uint64(1 << (source % 64))
+
+    def record(self, key: int, ok: bool, latency: float = 0.0,
+               source: Optional[str] = None, timestamp: Optional[float] = None):
+        """ثبت نتیجه یک تست (فقط در حافظه تا flush)"""
+        record = (key, timestamp or time.time(), float(latency) if ok else 0.0,
+                  hash64(source) & 0xFFFFFFFF if source else 0, 1 if ok else 0)
+        self._apply(*record)
+        self._buffer.append(record)
+
+    def features(self, keys: Sequence[int]) -> Dict[str, np.ndarray]:
+        """
+        خواندن دسته‌ای ویژگی‌های تاریخی
+
+        برای کلیدهای ناشناخته tests صفر است و مقادیر تأخیر NaN.
+        """
+        slots = np.fromiter((self._slots.get(key, -1) for key in keys),
+                            dtype=np.int64, count=len(keys))
+        known = slots >= 0
+        index = np.where(known, slots, 0)
+
+        tests = np.where(known, self.tests[index], 0)
+        successes = np.where(known, self.successes[index], 0)
+        recent_tests = np.minimum(tests, WINDOW_BITS)
+        recent_successes = np.where(known, _popcount(self.window[index]), 0)
+
+        p50, p90 = _nan_percentiles(self.latency_ring[index], (50, 90))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'tests': tests,
+                'successes': successes,
+                'success_rate': np.where(tests > 0, successes / np.maximum(tests, 1), 0.0),
+                'recent_tests': recent_tests,
+                'recent_successes': recent_successes,
+                'recent_success_rate': np.where(
+                    recent_tests > 0, recent_successes / np.maximum(recent_tests, 1), 0.0),
+                'latency_ewma': np.where(known, self.latency_ewma[index], np.nan),
+                'latency_p50': np.where(known, p50, np.nan),
+                'latency_p90': np.where(known, p90, np.nan),
+                'first_seen': np.where(known, self.first_seen[index], 0.0),
+                'last_seen': np.where(known, self.last_seen[index], 0.0),
+                'last_success': np.where(known, self.last_success[index], 0.0),
+                'source_count': np.where(known, _popcount(self.sources[index]), 0),
+            }
+
+    def _load(self):
+        """بارگذاری snapshot و اجرای مجدد لاگ"""
+        if os.path.exists(self.snapshot_file):
+            try:
+                with np.load(self.snapshot_file, allow_pickle=False) as data:
+                    self.generation = int(data['generation'])
+                    size = len(data['keys'])
+                    self._allocate(max(1024, 2 * size))
+                    for name in COLUMNS:
+                        getattr(self, name)[:size] = data[name]
+                    self.latency_ring[:size] = data['latency_ring']
+                self.size = size
+                self._slots = {int(key): slot for slot, key in enumerate(self.keys[:size].tolist())}
+            except Exception as e:
+                logger.error(f"Error loading feature store snapshot: {e}")
+
+        records = self._read_log()
+        for record in records.tolist():
+            self._apply(*record)
+        self.log_records = len(records)
+        if self.size:
+            logger.info(
+                f"Loaded feature store: {self.size} configs, {self.log_records} log records")
+
+    def _read_log(self) -> np.ndarray:
+        if not os.path.exists(self.log_file):
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        try:
+            with open(self.log_file, 'rb') as f:
+                header = f.read(LOG_HEADER.size)
+                if len(header) < LOG_HEADER.size:
+                    return np.empty(0, dtype=RECORD_DTYPE)
+                magic, generation = LOG_HEADER.unpack(header)
+                if magic != LOG_MAGIC or generation != self.generation:
+                    logger.info("Feature store log predates snapshot, ignoring it")
+                    return np.empty(0, dtype=RECORD_DTYPE)
+                # رکورد ناقص انتهای فایل (قطع هنگام نوشتن) نادیده گرفته می‌شود
+                data = f.read()
+            count = len(data) // RECORD_DTYPE.itemsize
+            return np.frombuffer(data[:count * RECORD_DTYPE.itemsize], dtype=RECORD_DTYPE)
+        except Exception as e:
+            logger.error(f"Error reading feature store log: {e}")
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+    def _reset_log(self):
+        os.makedirs(os.path.dirname(self.log_file) or '.', exist_ok=True)
+        with open(self.log_file, 'wb') as f:
+            f.write(LOG_HEADER.pack(LOG_MAGIC, self.generation))
+        self.log_records = 0
+
+    def flush(self):
+        """افزودن نتایج بافر شده به لاگ با یک نوشتن و compact در صورت نیاز"""
+        if self._buffer:
+            try:
+                if self._read_header_generation() != self.generation:
+                    self._reset_log()
+                with open(self.log_file, 'ab') as f:
+                    f.write(np.array(self._buffer, dtype=RECORD_DTYPE).tobytes())
+                self.log_records += len(self._buffer)
+                self._buffer = []
+            except Exception as e:
+                logger.error(f"Error writing feature store log: {e}")
+                return
+
+        if self.log_records >= self.config['compact_records']:
+            self.compact()
+
+    def _read_header_generation(self) -> Optional[int]:
+        try:
+            with open(self.log_file, 'rb') as f:
+                magic, generation = LOG_HEADER.unpack(f.read(LOG_HEADER.size))
+            return generation if magic == LOG_MAGIC else None
+        except (OSError, struct.error):
+            return None
+
+    def compact(self):
+        """نوشتن snapshot بدون ورودی‌های قدیمی و شروع لاگ جدید"""
+        oldest = time.time() - self.config['max_age_days'] * 86400
+        keep = np.flatnonzero(self.last_seen[:self.size] >= oldest)
+
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_file) or '.', exist_ok=True)
+            temp_path = self.snapshot_file + '.tmp'
+            columns = {name: getattr(self, name)[keep] for name in COLUMNS}
+            with open(temp_path, 'wb') as f:
+                np.savez(f, generation=np.int64(self.generation + 1),
+                         latency_ring=self.latency_ring[keep], **columns)
+            os.replace(temp_path, self.snapshot_file)
+        except Exception as e:
+            logger.error(f"Error saving feature store snapshot: {e}")
+            return
+
+        dropped = self.size - len(keep)
+        self.generation += 1
+        for name, column in columns.items():
+            getattr(self, name)[:len(keep)] = column
+        self.latency_ring[:len(keep)] = self.latency_ring[keep]
+        self._clear(len(keep), self.size)
+        self.size = len(keep)
+        self._slots = {int(key): slot for slot, key in enumerate(self.keys[:self.size].tolist())}
+        self._reset_log()
+        logger.info(f"🗜️ feature store فشرده شد: {self.size} کانفیگ، {dropped} ورودی قدیمی حذف شد")
+
+    def summary(self) -> Dict[str, int]:
+        return {'configs': self.size, 'log_records': self.log_records,
+                'buffered': len(self._buffer), 'generation': self.generation}
@@ -6,7 +6,7 @@ ML-based Config Scoring System
 """
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import json
 import math
@@ -24,10 +24,16 @@ class ConfigScore:
     details: Dict
 
 class MLConfigScorer:
-    """امتیازدهی هوشمند به کانفیگ‌ها"""
+    """
+    امتیازدهی هوشمند به کانفیگ‌ها
+
+    با feature_store (FeatureStore) امتیاز پایداری از نتایج واقعی تست‌های
+    اخیر هر کانفیگ (کلید feature_key در dict کانفیگ) خوانده می‌شود.
+    """
     
-    def __init__(self):
+    def __init__(self, feature_store=None):
         self.logger = logging.getLogger(__name__)
+        self.feature_store = feature_store
         
         # وزن‌های امتیازدهی
         self.weights = {
@@ -67,7 +73,7 @@ class MLConfigScorer:
             'AU': 0.5,    # استرالیا - خیلی دور
         }
         
-        # تاریخچه عملکرد (می‌تواند از database بیاید)
+        # تاریخچه عملکرد در حافظه (وقتی feature_store نیست)
         self.performance_history = {}
         
     def calculate_latency_score(self, latency_ms: float) -> float:
@@ -92,7 +98,8 @@ class MLConfigScorer:
         score = math.exp(-latency_ms / 200)
         return max(0.0, min(1.0, score))
     
-    def calculate_reliability_score(self, config_id: str, success_count: int = 0, total_tests: int = 1) -> float:
+    def calculate_reliability_score(self, config_id: str, success_count: int = 0, total_tests: int = 1,
+                                    history: Optional[Tuple[int, int]] = None) -> float:
         """
         محاسبه امتیاز قابلیت اطمینان
         
@@ -100,6 +107,7 @@ class MLConfigScorer:
             config_id: شناسه کانفیگ
             success_count: تعداد موفقیت‌ها
             total_tests: کل تست‌ها
+            history: (موفق، کل) از feature_store؛ در صورت وجود بر performance_history مقدم است
             
         Returns:
             امتیاز بین 0 تا 1
@@ -107,8 +115,10 @@ class MLConfigScorer:
         if total_tests == 0:
             return 0.5  # مقدار پیش‌فرض
         
-        # استفاده از تاریخچه
-        if config_id in self.performance_history:
+        # استفاده از تاریخچه (feature_store، سپس تاریخچه حافظه)
+        if history is not None:
+            success_count, total_tests = history
+        elif config_id in self.performance_history:
             history = self.performance_history[config_id]
             success_count = history.get('success', 0)
             total_tests = history.get('total', 1)
@@ -145,16 +155,36 @@ class MLConfigScorer:
         """
         return self.protocol_scores.get(protocol.lower(), 0.5)
     
-    def score_config(self, config: Dict) -> ConfigScore:
+    def _store_history(self, configs: List[Dict]) -> List[Optional[Tuple[int, int]]]:
+        """(موفق، کل) تست‌های اخیر هر کانفیگ از feature_store با یک خواندن دسته‌ای"""
+        if self.feature_store is None:
+            return [None] * len(configs)
+        
+        keys = [config.get('feature_key') for config in configs]
+        features = self.feature_store.features([key or 0 for key in keys])
+        return [
+            (int(successes), int(tests)) if key is not None and tests > 0 else None
+            for key, successes, tests in zip(
+                keys, features['recent_successes'], features['recent_tests'])
+        ]
+    
+    def score_config(self, config: Dict, history: Optional[Tuple[int, int]] = None) -> ConfigScore:
         """
         امتیازدهی کامل به یک کانفیگ
         
         Args:
             config: اطلاعات کانفیگ
+            history: (موفق، کل) تست‌های اخیر؛ در نبود آن از feature_store خوانده می‌شود
             
         Returns:
             ConfigScore
         """
+        if history is None:
+            history = self._store_history([config])[0]
+        return self._score(config, history)
+    
+    def _score(self, config: Dict, history: Optional[Tuple[int, int]]) -> ConfigScore:
+        """امتیازدهی با تاریخچه خوانده شده از feature_store (None: بدون تاریخچه در store)"""
         # استخراج اطلاعات
         latency = float(config.get('latency', '999ms').replace('ms', ''))
         protocol = config.get('protocol', 'unknown')
@@ -163,7 +193,7 @@ class MLConfigScorer:
         
         # محاسبه امتیازها
         latency_score = self.calculate_latency_score(latency)
-        reliability_score = self.calculate_reliability_score(config_id)
+        reliability_score = self.calculate_reliability_score(config_id, history=history)
         location_score = self.calculate_location_score(country)
         protocol_score = self.calculate_protocol_score(protocol)
         
@@ -213,8 +243,8 @@ class MLConfigScorer:
         """
         scored_configs = []
         
-        for config in configs:
-            score = self.score_config(config)
+        for config, history in zip(configs, self._store_history(configs)):
+            score = self._score(config, history)
             scored_configs.append((config, score))
         
         # مرتب‌سازی بر اساس امتیاز
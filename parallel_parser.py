@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel Config Parser
+تجزیه موازی دسته‌های بزرگ کانفیگ در چند هسته CPU
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# فیلدهایی از V2RayConfig که از worker برگردانده می‌شوند (raw_config در والد موجود است)
+PARSED_FIELDS = ('protocol', 'address', 'port', 'uuid', 'alter_id', 'network',
+                 'tls', 'country', 'sni', 'security', 'flow', 'path')
+
+# نمونه تجزیه‌گر در هر worker (در initializer ساخته می‌شود)
+_worker_parser = None
+
+
+def config_to_record(config) -> tuple:
+    """تبدیل V2RayConfig به tuple فشرده و قابل pickle/JSON"""
+    return tuple(getattr(config, field) for field in PARSED_FIELDS)
+
+
+def record_to_config(config_str: str, record):
+    """بازسازی V2RayConfig از tuple فشرده"""
+    from config_collector import V2RayConfig
+    return V2RayConfig(raw_config=config_str, **dict(zip(PARSED_FIELDS, record)))
+
+
+def _init_worker():
+    """ساخت تجزیه‌گر سبک در هر پردازه worker"""
+    global _worker_parser
+    from config_collector import V2RayCollector
+    _worker_parser = V2RayCollector.for_parsing()
+
+
+def parse_chunk(items: List[str]) -> List[Optional[tuple]]:
+    """
+    تجزیه یک chunk در پردازه worker
+
+    Args:
+        items: کانفیگ‌های خام
+
+    Returns:
+        برای هر کانفیگ یک tuple از PARSED_FIELDS یا None
+    """
+    parser = _worker_parser
+    results: List[Optional[tuple]] = []
+    for config_str in items:
+        config = parser.parse_config(config_str)
+        results.append(None if config is None else config_to_record(config))
+    return results
+
+
+class ParallelParser:
+    """تجزیه کانفیگ‌ها با ProcessPoolExecutor برای دسته‌های بزرگ"""
+
+    def __init__(self, collector):
+        options = collector.optimization_config
+        self.collector = collector
+        self.workers = options.get('parse_workers', 0) or os.cpu_count() or 1
+        self.chunk_size = max(1, options.get('parse_chunk_size', 1000))
+        self.threshold = options.get('parallel_parse_threshold', 2000)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: پردازه اصلی thread pool و event loop فعال دارد
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            logger.info(f"⚙️ pool تجزیه موازی با {self.workers} worker ایجاد شد")
+        return self._executor
+
+    def should_parallelize(self, count: int) -> bool:
+        return self.workers > 1 and count >= self.threshold
+
+    async def parse(self, config_strs: List[str]):
+        """
+        تجزیه لیست کانفیگ‌ها با حفظ ترتیب
+
+        Returns:
+            لیست V2RayConfig یا None هم‌تراز با ورودی
+        """
+        collector = self.collector
+        if not self.should_parallelize(len(config_strs)):
+            return [collector.parse_config(config_str) for config_str in config_strs]
+
+        items = [config_str.strip() for config_str in config_strs]
+        chunks = [items[i:i + self.chunk_size]
+                  for i in range(0, len(items), self.chunk_size)]
+
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            chunk_results = await asyncio.gather(
+                *[loop.run_in_executor(executor, parse_chunk, chunk) for chunk in chunks])
+        except Exception as e:
+            logger.warning(f"تجزیه موازی ناموفق بود، تجزیه سریال: {e}")
+            self.close()
+            return [collector.parse_config(config_str) for config_str in items]
+
+        parsed = []
+        for chunk, results in zip(chunks, chunk_results):
+            for config_str, record in zip(chunk, results):
+                parsed.append(None if record is None else record_to_config(
+                    config_str, record))
+        return parsed
+
+    def close(self):
+        """بستن پردازه‌های worker"""
+        if self._executor is not None:
+            if sys.version_info >= (3, 9):
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parse Memo
+نگهداری نتیجه تجزیه هر کانفیگ خام در طول سیکل و بین سیکل‌ها
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from parallel_parser import config_to_record, record_to_config
+
+logger = logging.getLogger(__name__)
+
+# نشانگر نبود نتیجه در memo (None یعنی کانفیگ قابل تجزیه نیست)
+MISSING = object()
+
+# نسخه فرمت لایه دائمی؛ با تغییر خروجی تجزیه‌گرها افزایش می‌یابد تا
+# recordهای قدیمی (مثلاً vmess بدون sni/path) استفاده نشوند
+CACHE_VERSION = 2
+
+
+def config_key(config_str: str) -> str:
+    """کلید پایدار کانفیگ خام برای لایه دائمی"""
+    return hashlib.blake2b(config_str.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ParseMemo:
+    """
+    memo تجزیه کانفیگ‌ها
+
+    لایه سیکل برای هر رشته یکتا یک شیء V2RayConfig نگه می‌دارد تا تمام مراحل
+    یک سیکل از همان شیء استفاده کنند. لایه دائمی (اختیاری) فقط فیلدهای تجزیه
+    را با کلید hash رشته ذخیره می‌کند؛ در سیکل بعد از آن شیء تازه ساخته می‌شود
+    چون نتایج تست روی شیء سیکل قبل نوشته شده‌اند.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, max_idle_cycles: int = 3):
+        self.cache_file = cache_file
+        self.max_idle_cycles = max_idle_cycles
+        self.cycle = 0
+        self._cycle_configs: Dict[str, object] = {}
+        # key -> [آخرین سیکل استفاده، record یا None]
+        self._persistent: Dict[str, list] = {}
+        self.stats = {'hits': 0, 'persistent_hits': 0, 'misses': 0}
+        self._load()
+
+    def _load(self):
+        """بارگذاری لایه دائمی از دیسک"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.cycle = data.get('cycle', 0)
+            if data.get('version') != CACHE_VERSION:
+                logger.info("Parse cache format changed, discarding old entries")
+                return
+            self._persistent = data.get('entries', {})
+            logger.info(f"Loaded {len(self._persistent)} parse cache entries")
+        except Exception as e:
+            logger.error(f"Error loading parse cache: {e}")
+
+    def save(self):
+        """حذف ورودی‌های قدیمی و ذخیره لایه دائمی روی دیسک"""
+        if not self.cache_file:
+            return
+
+        oldest = self.cycle - self.max_idle_cycles
+        self._persistent = {key: entry for key, entry in self._persistent.items()
+                            if entry[0] > oldest}
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'cycle': self.cycle,
+                           'entries': self._persistent},
+                          f, separators=(',', ':'))
+        except Exception as e:
+            logger.error(f"Error saving parse cache: {e}")
+
+    def new_cycle(self):
+        """شروع سیکل جدید: پاک کردن اشیاء سیکل قبل"""
+        self.cycle += 1
+        self._cycle_configs = {}
+        self.stats = {'hits': 0, 'persistent_hits': 0, 'misses': 0}
+
+    def lookup(self, config_str: str):
+        """نتیجه تجزیه ذخیره شده یا MISSING"""
+        config = self._cycle_configs.get(config_str, MISSING)
+        if config is not MISSING:
+            self.stats['hits'] += 1
+            return config
+
+        if self._persistent:
+            entry = self._persistent.get(config_key(config_str))
+            if entry is not None:
+                entry[0] = self.cycle
+                record = entry[1]
+                config = None if record is None else record_to_config(
+                    config_str, record)
+                self._cycle_configs[config_str] = config
+                self.stats['persistent_hits'] += 1
+                return config
+
+        self.stats['misses'] += 1
+        return MISSING
+
+    def store(self, config_str: str, config):
+        """ثبت نتیجه تجزیه در هر دو لایه"""
+        self._cycle_configs[config_str] = config
+        if self.cache_file:
+            self._persistent[config_key(config_str)] = [
+                self.cycle, None if config is None else list(config_to_record(config))]
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.stats, cycle_entries=len(self._cycle_configs),
+                    persistent_entries=len(self._persistent))
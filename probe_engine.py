@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Async Probe Engine
+تست اتصال TCP غیرمسدودکننده با asyncio و محدودیت همزمانی
+"""
+
+import asyncio
+import logging
+import math
+import ssl
+import time
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from adaptive_limiter import AdaptiveLimiter, classify_error
+
+logger = logging.getLogger(__name__)
+
+# file descriptor هایی که برای لاگ، کش و اتصال‌های HTTP آزاد می‌مانند
+FD_RESERVE = 64
+
+
+def fd_soft_limit() -> int:
+    """حد نرم تعداد file descriptor پردازه (0 یعنی نامعلوم)"""
+    if resource is None:
+        return 0
+    try:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ValueError, OSError):
+        return 0
+    return 0 if soft == resource.RLIM_INFINITY else soft
+
+
+_SSL_CONTEXT = None
+
+
+def shared_ssl_context() -> ssl.SSLContext:
+    """SSLContext مشترک تست‌ها (بدون بررسی گواهی، مثل کلاینت‌های V2Ray با allowInsecure)"""
+    global _SSL_CONTEXT
+    if _SSL_CONTEXT is None:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        _SSL_CONTEXT = context
+    return _SSL_CONTEXT
+
+
+class HandshakeResult(NamedTuple):
+    """نتیجه تست handshake؛ phase مرحله ناموفق است (connect، tls یا first_byte)"""
+    ok: bool
+    phase: str = ''
+    connect_ms: float = 0.0
+    tls_ms: float = 0.0
+    first_byte_ms: float = 0.0
+    response: bytes = b''
+
+    @property
+    def latency(self) -> float:
+        """تأخیر تا پایان handshake (اتصال + TLS)"""
+        return self.connect_ms + self.tls_ms if self.ok else 0.0
+
+
+class LatencyStats(NamedTuple):
+    """آمار چند نمونه اتصال به یک endpoint (میلی‌ثانیه)"""
+    ok: bool
+    latency: float = 0.0  # میانه
+    latency_min: float = 0.0
+    latency_p90: float = 0.0
+    jitter: float = 0.0
+    loss_ratio: float = 1.0
+    samples: int = 0
+
+    @classmethod
+    def from_samples(cls, latencies: List[float], attempts: int) -> 'LatencyStats':
+        """
+        ساخت آمار از تأخیر نمونه‌های موفق
+
+        jitter میانگین اختلاف مطلق نمونه‌های متوالی است (مانند RFC 3550 بدون هموارسازی).
+        """
+        if not latencies:
+            return cls(False, samples=attempts)
+
+        ordered = sorted(latencies)
+        count = len(ordered)
+        middle = count // 2
+        median = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+        p90 = ordered[max(0, math.ceil(0.9 * count) - 1)]
+        jitter = (sum(abs(b - a) for a, b in zip(latencies, latencies[1:])) / (count - 1)
+                  if count > 1 else 0.0)
+        return cls(True, median, ordered[0], p90, jitter,
+                   (attempts - count) / attempts, attempts)
+
+
+class _HandshakeProtocol(asyncio.Protocol):
+    """پروتکل حداقلی برای دریافت اولین بایت پاسخ"""
+
+    def __init__(self, loop):
+        self.first_data = loop.create_future()
+
+    def data_received(self, data):
+        if not self.first_data.done():
+            self.first_data.set_result(data)
+
+    def connection_lost(self, exc):
+        if not self.first_data.done():
+            self.first_data.set_result(b'')
+
+
+class AsyncProbeEngine:
+    """
+    تست اتصال TCP هزاران endpoint به صورت همزمان روی event loop
+
+    هر تست یک connect غیرمسدودکننده است که پس از برقراری فوراً abort می‌شود.
+    تعداد اتصال همزمان با پنجره AdaptiveLimiter محدود می‌شود که سقف آن حد
+    file descriptor پردازه است؛ در حالت adaptive پنجره بر اساس timeout‌ها،
+    خطاهای محلی و تأخیر event loop تنظیم می‌شود. زمان‌ها با ساعت monotonic
+    اندازه‌گیری می‌شوند.
+    """
+
+    def __init__(self, max_concurrency: int = 2000, timeout: float = 2.0,
+                 tls_timeout: float = 3.0, first_byte_timeout: float = 3.0,
+                 samples: int = 1, sample_interval: float = 0.2,
+                 adaptive: bool = False, initial_concurrency: int = 256):
+        limit = fd_soft_limit()
+        if limit and max_concurrency > limit - FD_RESERVE:
+            logger.info(
+                f"همزمانی تست از {max_concurrency} به {limit - FD_RESERVE} (حد file descriptor) کاهش یافت")
+            max_concurrency = max(1, limit - FD_RESERVE)
+
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.tls_timeout = tls_timeout
+        self.first_byte_timeout = first_byte_timeout
+        self.samples = max(1, samples)
+        self.sample_interval = sample_interval
+        self.limiter = AdaptiveLimiter(
+            initial=initial_concurrency, minimum=min(16, max_concurrency),
+            maximum=max_concurrency, adaptive=adaptive)
+        # probes: اتصال‌های واقعی، shared: کانفیگ‌هایی که نتیجه endpoint مشترک گرفتند
+        self.stats = {'probes': 0, 'shared': 0}
+
+    async def probe(self, host: str, port: int) -> Tuple[bool, float]:
+        """
+        تست اتصال به یک endpoint
+
+        Returns:
+            (موفق، تأخیر اتصال به میلی‌ثانیه)
+        """
+        await self.limiter.acquire()
+        outcome = None
+        try:
+            start = time.perf_counter()
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), self.timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, UnicodeError) as e:
+                outcome = classify_error(e)
+                return False, 0.0
+
+            latency = (time.perf_counter() - start) * 1000
+            writer.transport.abort()
+            outcome = 'ok'
+            return True, latency
+        finally:
+            self.limiter.release(outcome)
+
+    async def sample(self, host: str, port: int, samples: Optional[int] = None) -> LatencyStats:
+        """
+        چند اتصال با فاصله زمانی به یک endpoint
+
+        هر نمونه جداگانه جایگاه پنجره همزمانی را می‌گیرد و در فاصله بین نمونه‌ها آزاد
+        است، پس نمونه‌ها در همان بودجه همزمانی بین endpoint‌ها پخش می‌شوند.
+        اگر اولین نمونه ناموفق باشد ادامه داده نمی‌شود تا endpoint‌های مرده
+        بیش از یک تلاش هزینه نداشته باشند.
+        """
+        samples = samples or self.samples
+        latencies = []
+        attempts = 0
+        for index in range(samples):
+            if index:
+                await asyncio.sleep(self.sample_interval)
+            is_working, latency = await self.probe(host, port)
+            attempts += 1
+            if is_working:
+                latencies.append(latency)
+            elif index == 0:
+                break
+        return LatencyStats.from_samples(latencies, attempts)
+
+    async def handshake(self, host: str, port: int, tls: bool = False,
+                        server_hostname: Optional[str] = None,
+                        payload: bytes = b'') -> HandshakeResult:
+        """
+        تست handshake با timeout جداگانه برای هر مرحله
+
+        مراحل: اتصال TCP، handshake TLS (در صورت نیاز با SSLContext مشترک)
+        و در صورت وجود payload، ارسال آن و انتظار برای اولین بایت پاسخ.
+        از همان پنجره همزمانی تست‌های TCP استفاده می‌شود.
+        """
+        await self.limiter.acquire()
+        outcome = None
+        try:
+            loop = asyncio.get_running_loop()
+            transport = None
+            phase = 'connect'
+            timings = {}
+            try:
+                start = time.perf_counter()
+                transport, protocol = await asyncio.wait_for(
+                    loop.create_connection(lambda: _HandshakeProtocol(loop), host, port),
+                    self.timeout)
+                timings['connect_ms'] = (time.perf_counter() - start) * 1000
+
+                if tls:
+                    phase = 'tls'
+                    start = time.perf_counter()
+                    transport = await asyncio.wait_for(
+                        loop.start_tls(transport, protocol, shared_ssl_context(),
+                                       server_hostname=server_hostname or host),
+                        self.tls_timeout)
+                    timings['tls_ms'] = (time.perf_counter() - start) * 1000
+
+                response = b''
+                if payload:
+                    phase = 'first_byte'
+                    start = time.perf_counter()
+                    transport.write(payload)
+                    response = await asyncio.wait_for(
+                        protocol.first_data, self.first_byte_timeout)
+                    timings['first_byte_ms'] = (time.perf_counter() - start) * 1000
+
+                outcome = 'ok'
+                return HandshakeResult(True, response=response, **timings)
+            except (OSError, asyncio.TimeoutError, ValueError, UnicodeError) as e:
+                outcome = classify_error(e)
+                return HandshakeResult(False, phase, **timings)
+            finally:
+                if transport is not None:
+                    transport.abort()
+        finally:
+            self.limiter.release(outcome)
+
+    async def _probe_group(self, items: List, host: str, port: int):
+        return items, await self.sample(host, port)
+
+    async def iter_probes(self, endpoints: Iterable[Tuple[object, str, int]]) -> AsyncIterator[Tuple[object, LatencyStats]]:
+        """
+        تست endpoint‌ها و برگرداندن نتایج به ترتیب تکمیل
+
+        هر host:port یکتا فقط یک بار (با samples نمونه) تست می‌شود و نتیجه
+        آن به تمام شیءهای همان endpoint داده می‌شود.
+
+        Args:
+            endpoints: سه‌تایی‌های (شیء دلخواه، host، port)
+
+        Yields:
+            (شیء، آمار تأخیر)
+        """
+        groups: Dict[Tuple[str, int], List] = {}
+        for item, host, port in endpoints:
+            groups.setdefault((host, port), []).append(item)
+
+        tasks = [asyncio.ensure_future(self._probe_group(items, host, port))
+                 for (host, port), items in groups.items()]
+        self.stats['probes'] += len(tasks)
+        self.stats['shared'] += sum(len(items) for items in groups.values()) - len(tasks)
+        try:
+            for future in asyncio.as_completed(tasks):
+                items, stats = await future
+                for item in items:
+                    yield item, stats
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def probe_many(self, endpoints: Iterable[Tuple[object, str, int]]) -> List[Tuple[object, LatencyStats]]:
+        """تست endpoint‌ها و برگرداندن تمام نتایج (به ترتیب تکمیل)"""
+        return [result async for result in self.iter_probes(endpoints)]
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tiered Probe Funnel
+تست مرحله‌ای کانفیگ‌ها: TCP برای همه، TLS برای بازماندگان، handshake پروتکل برای بهترین‌ها
+"""
+
+import asyncio
+import ipaddress
+import logging
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from probe_engine import AsyncProbeEngine, LatencyStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_FUNNEL_CONFIG = {
+    'enabled': True,
+    'tcp_budget_seconds': 900,
+    'tls_concurrency': 500,
+    'tls_timeout': 3.0,
+    'tls_budget_seconds': 300,
+    'protocol_concurrency': 100,
+    'protocol_timeout': 5.0,
+    'protocol_budget_seconds': 300,
+    'protocol_top_n': 5,
+    'drop_unverified': False,
+}
+
+# پروتکل‌هایی که handshake اختصاصی در AdvancedProtocolTester دارند
+HANDSHAKE_PROTOCOLS = ('vmess', 'vless', 'trojan', 'ss', 'ssr')
+
+STAGES = ('tcp', 'tls', 'protocol')
+
+
+def uses_tls(config) -> bool:
+    """کانفیگ‌هایی که لایه بیرونی آن‌ها TLS (یا Reality) است"""
+    return config.protocol == 'trojan' or bool(config.tls)
+
+
+def server_name(config) -> str:
+    """
+    نام سرور برای SNI؛ خالی اگر نه sni دارد و نه آدرسش hostname است
+
+    handshake بدون SNI با IP یک CDN رد می‌شود حتی اگر کانفیگ سالم باشد،
+    پس نتیجه آن معیار درستی برای رد کانفیگ نیست.
+    """
+    if config.sni:
+        return config.sni
+    try:
+        ipaddress.ip_address(config.address.strip('[]'))
+        return ''
+    except ValueError:
+        return config.address
+
+
+def mark_failed(config):
+    """ثبت شکست در مراحل ۲ و ۳ (پاک کردن آمار تأخیر مرحله TCP)"""
+    config.is_working = False
+    config.latency = 0.0
+    config.latency_min = 0.0
+    config.latency_p90 = 0.0
+    config.jitter = 0.0
+
+
+class ProbeFunnel:
+    """
+    قیف تست سه مرحله‌ای
+
+    1. اتصال TCP برای تمام کانفیگ‌ها با timeout کوتاه
+    2. handshake TLS/Reality فقط برای کانفیگ‌های TLS که مرحله ۱ را گذرانده‌اند
+       و نام سرور دارند (sni یا آدرس hostname)
+    3. handshake پروتکل برای top-N هر گروه (پروتکل، کشور) بر اساس تأخیر
+
+    مراحل ۱ و ۲ برای هر endpoint یک بار اجرا و نتیجه بین کانفیگ‌های آن
+    تقسیم می‌شود. هر مرحله همزمانی جداگانه و بودجه زمانی مشترک برای کل
+    سیکل دارد (از اولین دسته‌ای که به آن مرحله می‌رسد). سهم top-N هر گروه
+    هم در کل سیکل شمرده می‌شود. کانفیگ‌هایی که در بودجه مرحله ۱ تست نشوند
+    جداگانه و بدون نتیجه برمی‌گردند؛ در مراحل بعد نتیجه مرحله قبل حفظ
+    می‌شود. funnel_stage هر کانفیگ عمیق‌ترین مرحله موفق است.
+    """
+
+    def __init__(self, tcp_engine: AsyncProbeEngine, config: Optional[Dict] = None,
+                 protocol_tester=None):
+        self.config = dict(DEFAULT_PROBE_FUNNEL_CONFIG)
+        self.config.update(config or {})
+
+        self.tcp_engine = tcp_engine
+        self.tls_engine = AsyncProbeEngine(
+            max_concurrency=self.config['tls_concurrency'],
+            timeout=tcp_engine.timeout, tls_timeout=self.config['tls_timeout'])
+
+        if protocol_tester is None:
+            from advanced_protocol_tester import AdvancedProtocolTester
+            timeout = self.config['protocol_timeout']
+            protocol_tester = AdvancedProtocolTester(AsyncProbeEngine(
+                max_concurrency=self.config['protocol_concurrency'], timeout=timeout,
+                tls_timeout=timeout, first_byte_timeout=timeout))
+        self.protocol_tester = protocol_tester
+
+        self.new_cycle()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Dict[str, float]]:
+        return {stage: {'tested': 0, 'passed': 0, 'skipped': 0, 'probes': 0, 'seconds': 0.0}
+                for stage in STAGES}
+
+    def new_cycle(self):
+        self.stats = self._empty_stats()
+        self._deadlines: Dict[str, float] = {}
+        self._protocol_selected: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def _remaining(self, stage: str) -> float:
+        """زمان باقی‌مانده از بودجه سیکل یک مرحله"""
+        deadline = self._deadlines.get(stage)
+        if deadline is None:
+            deadline = self._deadlines[stage] = \
+                time.monotonic() + self.config[f'{stage}_budget_seconds']
+        return deadline - time.monotonic()
+
+    async def _run_stage(self, stage: str, configs: List,
+                         check: Callable[[object], Awaitable[Tuple]],
+                         group_key: Optional[Callable[[object], Hashable]] = None
+                         ) -> List[Tuple[object, Tuple]]:
+        """
+        اجرای یک مرحله در باقی‌مانده بودجه زمانی سیکل
+
+        با group_key کانفیگ‌های هم‌کلید (مثلاً همان host:port) یک بار تست
+        می‌شوند و نتیجه به همه داده می‌شود.
+
+        Returns:
+            (کانفیگ، نتیجه) برای کانفیگ‌هایی که در بودجه تست شدند؛
+            اولین عضو نتیجه موفقیت تست است
+        """
+        if not configs:
+            return []
+
+        budget = self._remaining(stage)
+        if budget <= 0:
+            self.stats[stage]['skipped'] += len(configs)
+            return []
+
+        groups: Dict[Hashable, List] = {}
+        for config in configs:
+            key = group_key(config) if group_key else id(config)
+            groups.setdefault(key, []).append(config)
+
+        start = time.perf_counter()
+        tasks = {asyncio.ensure_future(check(group[0])): group for group in groups.values()}
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.debug(f"بودجه مرحله {stage} تمام شد: {len(pending)} endpoint تست نشد")
+
+        results = []
+        for task in done:
+            if task.cancelled() or task.exception() is not None:
+                continue
+            result = task.result()
+            results.extend((config, result) for config in tasks[task])
+
+        stats = self.stats[stage]
+        stats['tested'] += len(results)
+        stats['passed'] += sum(1 for _, result in results if result[0])
+        stats['skipped'] += len(configs) - len(results)
+        stats['probes'] += len(tasks)
+        stats['seconds'] += time.perf_counter() - start
+        return results
+
+    @staticmethod
+    def _endpoint(config) -> Tuple[str, int]:
+        return config.connect_host, config.port
+
+    @staticmethod
+    def _tls_endpoint(config) -> Tuple[str, int, str]:
+        return config.connect_host, config.port, server_name(config).lower()
+
+    async def _tcp_check(self, config) -> LatencyStats:
+        return await self.tcp_engine.sample(config.connect_host, config.port)
+
+    async def _tls_check(self, config) -> Tuple[bool, float]:
+        result = await self.tls_engine.handshake(
+            config.connect_host, config.port, tls=True,
+            server_hostname=server_name(config))
+        return result.ok, result.latency
+
+    async def _protocol_check(self, config) -> Tuple[bool, float]:
+        is_valid, latency, _ = await self.protocol_tester.test_handshake(config)
+        return is_valid, latency
+
+    def _top_per_group(self, configs: List) -> List:
+        """
+        بهترین کانفیگ‌های هر گروه (پروتکل، کشور) بر اساس تأخیر
+
+        هر گروه در کل سیکل حداکثر N کانفیگ دارد؛ دسته‌ها به ترتیب رسیدن
+        از سهم باقی‌مانده گروه استفاده می‌کنند.
+        """
+        groups = defaultdict(list)
+        for config in configs:
+            if config.protocol in HANDSHAKE_PROTOCOLS:
+                groups[(config.protocol, config.country)].append(config)
+
+        top_n = self.config['protocol_top_n']
+        selected = []
+        for key, group in groups.items():
+            share = top_n - self._protocol_selected[key]
+            if share <= 0:
+                continue
+            group.sort(key=lambda config: config.rank_key)
+            selected.extend(group[:share])
+            self._protocol_selected[key] += len(group[:share])
+        return selected
+
+    async def run(self, configs: List) -> Tuple[List, List]:
+        """
+        اجرای قیف روی یک دسته کانفیگ
+
+        Returns:
+            (کانفیگ‌هایی که نتیجه تست دارند (is_working، latency و funnel_stage
+            تنظیم شده)، کانفیگ‌هایی که در بودجه مرحله ۱ تست نشدند)
+        """
+        # مرحله ۱: TCP (یک بار برای هر host:port)
+        tested = []
+        survivors = []
+        for config, stats in await self._run_stage(
+                'tcp', configs, self._tcp_check, group_key=self._endpoint):
+            config.record_latency(stats)
+            config.funnel_stage = 1 if stats.ok else 0
+            tested.append(config)
+            if stats.ok:
+                survivors.append(config)
+
+        # مرحله ۲: TLS فقط برای کانفیگ‌های TLS دارای نام سرور (یک بار برای هر endpoint و SNI)
+        for config, (ok, _) in await self._run_stage(
+                'tls', [config for config in survivors if uses_tls(config) and server_name(config)],
+                self._tls_check, group_key=self._tls_endpoint):
+            if ok:
+                config.funnel_stage = 2
+            else:
+                mark_failed(config)
+
+        # مرحله ۳: handshake پروتکل برای بهترین‌های هر گروه (برای هر کانفیگ، چون credential دارد)
+        candidates = self._top_per_group(
+            [config for config in survivors if config.is_working])
+        for config, (ok, _) in await self._run_stage(
+                'protocol', candidates, self._protocol_check):
+            if ok:
+                config.funnel_stage = 3
+            elif self.config['drop_unverified']:
+                mark_failed(config)
+
+        tested_ids = {id(config) for config in tested}
+        return tested, [config for config in configs if id(config) not in tested_ids]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: dict(stats, seconds=round(stats['seconds'], 2))
+                for stage, stats in self.stats.items()}
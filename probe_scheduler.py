@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Probe Scheduler
+زمان‌بندی تست کانفیگ‌ها با سهمیه هر پروتکل و مهلت کل سیکل
+"""
+
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_SCHEDULER_CONFIG = {
+    'enabled': True,
+    'cycle_deadline_seconds': 1500,
+    'quota_headroom': 1.25,
+    'apply_geo_filter': False,
+}
+
+PROTOCOL_NAMES = {'shadowsocks': 'ss', 'shadowsocksr': 'ssr'}
+
+# کشور نامعلوم یک کشور واقعی نیست و سهمیه کشوری به آن اعمال نمی‌شود
+UNKNOWN_COUNTRIES = ('unknown', '')
+
+
+class Bucket:
+    """شمارنده نتایج یک سهمیه (پروتکل یا کشور)"""
+    __slots__ = ('quota', 'working', 'tested', 'in_flight')
+
+    def __init__(self, quota: float):
+        self.quota = quota
+        self.working = 0
+        self.tested = 0
+        self.in_flight = 0
+
+    @property
+    def success_rate(self) -> float:
+        # تخمین با پیشین ۵۰٪ تا اولین نتایج
+        return (self.working + 1) / (self.tested + 2)
+
+    @property
+    def expected(self) -> float:
+        """تعداد سالم مورد انتظار با احتساب تست‌های در جریان"""
+        return self.working + self.in_flight * self.success_rate
+
+    @property
+    def full(self) -> bool:
+        return self.expected >= self.quota
+
+
+class ProbeScheduler:
+    """
+    زمان‌بندی تست در جلوی tester
+
+    سهمیه پروتکل همان محدودیت max_configs_per_protocol در categorize_configs
+    است با کمی حاشیه تا مرتب‌سازی بر اساس تأخیر هنوز انتخاب داشته باشد.
+    کانفیگ‌های پروتکلی که با احتساب تست‌های در جریان سهمیه‌اش پر شده، و
+    تمام کانفیگ‌ها پس از مهلت سیکل، تست نمی‌شوند. کشورهای اولویت‌دار
+    GEO_FILTER_CONFIG فقط ترتیب تست را تغییر می‌دهند.
+
+    خروجی معمولی کشورهای مسدود و سهمیه هر کشور را اعمال نمی‌کند، پس این
+    دو فقط با apply_geo_filter (و GEO_FILTER_CONFIG فعال) در زمان‌بندی
+    اعمال می‌شوند؛ در آن حالت کانفیگ‌های حذف شده در خروجی هم نخواهند بود.
+    """
+
+    def __init__(self, config: Optional[Dict] = None,
+                 categorization: Optional[Dict] = None, geo_filter: Optional[Dict] = None):
+        self.config = dict(DEFAULT_PROBE_SCHEDULER_CONFIG)
+        self.config.update(config or {})
+        categorization = categorization or {}
+        geo_filter = geo_filter or {}
+        headroom = self.config['quota_headroom']
+
+        self.protocol_quota = categorization.get('max_configs_per_protocol', 1000) * headroom
+        self.country_quota = geo_filter.get(
+            'max_configs_per_country',
+            categorization.get('max_configs_per_country', 500)) * headroom
+
+        geo_enabled = geo_filter.get('enabled', False)
+        self.geo_filter = geo_enabled and self.config['apply_geo_filter']
+        self.blocked = {c.upper() for c in geo_filter.get('blocked_countries', [])} \
+            if self.geo_filter else set()
+        preferred = list(geo_filter.get('priority_countries', [])) if geo_enabled else []
+        if geo_enabled and geo_filter.get('prefer_nearby'):
+            preferred += geo_filter.get('nearby_countries', [])
+        self.country_rank = {c.upper(): rank for rank, c in enumerate(preferred)}
+
+        self.new_cycle()
+
+    def new_cycle(self):
+        self.deadline = time.monotonic() + self.config['cycle_deadline_seconds']
+        self.protocols: Dict[str, Bucket] = defaultdict(lambda: Bucket(self.protocol_quota))
+        self.countries: Dict[str, Bucket] = defaultdict(lambda: Bucket(self.country_quota))
+        self.stats = {'admitted': 0, 'skipped_quota': 0,
+                      'skipped_blocked': 0, 'skipped_deadline': 0}
+        self._pending: set = set()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    @staticmethod
+    def _keys(config) -> Tuple[str, str]:
+        protocol = config.protocol.lower()
+        return PROTOCOL_NAMES.get(protocol, protocol), (config.country or 'unknown').upper()
+
+    def _buckets(self, config) -> List[Bucket]:
+        protocol, country = self._keys(config)
+        buckets = [self.protocols[protocol]]
+        if self.geo_filter and country.lower() not in UNKNOWN_COUNTRIES:
+            buckets.append(self.countries[country])
+        return buckets
+
+    def order(self, configs: List) -> List:
+        """
+        ترتیب تست: نوبتی بین پروتکل‌ها (کم‌تعدادترها اول) و در هر پروتکل
+        کشورهای اولویت‌دار اول؛ ترتیب ورودی در بقیه موارد حفظ می‌شود.
+        """
+        groups: Dict[str, List] = defaultdict(list)
+        for config in configs:
+            groups[self._keys(config)[0]].append(config)
+
+        default_rank = len(self.country_rank)
+        queues = []
+        for group in sorted(groups.values(), key=len):
+            group.sort(key=lambda config: self.country_rank.get(
+                self._keys(config)[1], default_rank))
+            queues.append(group)
+
+        ordered = []
+        for index in range(max((len(queue) for queue in queues), default=0)):
+            ordered.extend(queue[index] for queue in queues if index < len(queue))
+        return ordered
+
+    def admit(self, configs: List) -> List:
+        """انتخاب کانفیگ‌هایی که هنوز ارزش تست دارند (و ثبت آن‌ها به عنوان در جریان)"""
+        if self.expired:
+            self.stats['skipped_deadline'] += len(configs)
+            return []
+
+        admitted = []
+        for config in configs:
+            if self._keys(config)[1] in self.blocked:
+                self.stats['skipped_blocked'] += 1
+                continue
+            buckets = self._buckets(config)
+            if any(bucket.full for bucket in buckets):
+                self.stats['skipped_quota'] += 1
+                continue
+            for bucket in buckets:
+                bucket.in_flight += 1
+            self._pending.add(id(config))
+            admitted.append(config)
+
+        self.stats['admitted'] += len(admitted)
+        return admitted
+
+    def _release(self, config, buckets: List[Bucket]):
+        if id(config) in self._pending:
+            self._pending.discard(id(config))
+            for bucket in buckets:
+                bucket.in_flight -= 1
+
+    def settle(self, configs: List):
+        """پایان تست کانفیگ‌های پذیرفته شده؛ کانفیگ‌های بدون نتیجه از در جریان خارج می‌شوند"""
+        for config in configs:
+            self._release(config, self._buckets(config))
+
+    def record(self, config):
+        """ثبت نتیجه یک کانفیگ (تست شده یا بازیابی شده از فهرست)"""
+        buckets = self._buckets(config)
+        self._release(config, buckets)
+        for bucket in buckets:
+            bucket.tested += 1
+            if config.is_working:
+                bucket.working += 1
+
+    def summary(self) -> Dict[str, object]:
+        return dict(self.stats, full_protocols=sorted(
+            name for name, bucket in self.protocols.items() if bucket.working >= bucket.quota))
@@ -129,6 +129,14 @@ def test_config_parsing():
         else:
             print("⚠️ تجزیه VLESS ناموفق بود")
 
+        # تست تجزیه لینک IPv6 و پارامترهای query
+        parsed = collector.parse_config(
+            "vless://uuid-1234@[2001:db8::1]:2053?security=reality&sni=a.com&type=grpc&flow=xtls-rprx-vision#Test")
+        assert parsed and parsed.address == "2001:db8::1" and parsed.port == 2053
+        assert (parsed.sni, parsed.network, parsed.flow) == (
+            "a.com", "grpc", "xtls-rprx-vision")
+        print("✅ تجزیه IPv6 و پارامترهای VLESS موفق بود")
+
         return True
     except Exception as e:
         print(f"❌ خطا در تست تجزیه کانفیگ: {e}")
@@ -136,6 +144,341 @@ def test_config_parsing():
         return False
 
 
+async def test_streaming_ingest():
+    """تست دریافت جریانی کانفیگ‌ها"""
+    print("🧪 تست دریافت جریانی کانفیگ‌ها...")
+
+    try:
+        import base64
+        import hashlib
+        from config_ingest import iter_config_batches, prepend_chunks, read_head
+
+        lines = [
+            f"vless://12345678-abcd-efgh-ijkl-mnop-qrstuv@test{i}.com:443?security=tls#T{i}"
+            for i in range(300)
+        ]
+        body = base64.b64encode('\n'.join(lines).encode())
+
+        async def chunks(size):
+            for i in range(0, len(body), size):
+                yield body[i:i + size]
+
+        # اندازه chunk نباید روی نتیجه و hash محتوا اثر بگذارد
+        for chunk_size in (7, 100, 700, 4096, len(body)):
+            configs = []
+            hasher = hashlib.sha256()
+            stream = chunks(chunk_size)
+            head = await read_head(stream)
+            async for batch in iter_config_batches(prepend_chunks(head, stream),
+                                                   batch_size=64, hasher=hasher):
+                configs.extend(batch)
+            assert configs == lines, f"خروجی نادرست با chunk_size={chunk_size}"
+            assert hasher.hexdigest() == hashlib.sha256(body).hexdigest(), \
+                f"hash نادرست با chunk_size={chunk_size}"
+
+        # لینک vmess بدون decode در مرحله دریافت عبور می‌کند
+        from config_ingest import classify_lines
+        vmess = "vmess://" + base64.b64encode(b'{"add": "1.2.3.4", "port": 8080}').decode()
+        assert classify_lines(["# comment", vmess, ""]) == [vmess]
+
+        print("✅ دریافت جریانی به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست دریافت جریانی: {e}")
+        traceback.print_exc()
+        return False
+
+
+def test_config_dedup():
+    """تست حذف تکراری بر اساس هویت استاندارد"""
+    print("🧪 تست حذف تکراری کانفیگ‌ها...")
+
+    try:
+        from config_collector import V2RayCollector
+
+        collector = V2RayCollector()
+        links = [
+            "vless://uuid-1111@test.com:2053?security=tls&sni=a.com#A",
+            "vless://uuid-1111@test.com:2053?security=tls&sni=a.com#A",
+            "vless://uuid-1111@test.com:2053?security=tls&sni=a.com#B",
+            "vless://uuid-1111@TEST.com:2053?sni=a.com&security=tls#C",
+            "vless://uuid-2222@test.com:2053?security=tls&sni=a.com#D",
+        ]
+        unique = collector.remove_duplicate_configs_advanced(links)
+
+        # همان endpoint با نام یا ترتیب پارامتر متفاوت ادغام می‌شود، credential متفاوت نه
+        assert unique == [links[0], links[4]], f"خروجی نادرست: {unique}"
+        stats = collector.dedup_stats
+        assert (stats['exact'], stats['remark'], stats['equivalent']) == (1, 1, 1)
+
+        # vmess با همان add/port/id ولی path متفاوت دو endpoint جداست
+        import base64
+        import json
+        vmess = [
+            "vmess://" + base64.b64encode(json.dumps({
+                "add": "1.2.3.4", "port": 443, "id": "uuid-3333", "net": "ws",
+                "tls": "tls", "host": "a.example.com", "path": path}).encode()).decode()
+            for path in ("/a", "/b")
+        ]
+        assert collector.remove_duplicate_configs_advanced(vmess) == vmess
+
+        print("✅ حذف تکراری به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست حذف تکراری: {e}")
+        traceback.print_exc()
+        return False
+
+
+def test_seen_index():
+    """تست ذخیره و بازیابی کامل نتیجه تست در فهرست کانفیگ‌های دیده شده"""
+    print("🧪 تست فهرست کانفیگ‌های دیده شده...")
+
+    try:
+        import tempfile
+        from config_collector import V2RayConfig
+        from seen_index import RESULT_FIELDS, SeenIndex
+
+        with tempfile.TemporaryDirectory() as directory:
+            index_config = {'index_file': os.path.join(directory, 'seen.json')}
+            tested = V2RayConfig("vless", "10.0.0.1", 443, "u", is_working=True, latency=120.0,
+                                 latency_min=95.0, latency_p90=180.0, jitter=22.5,
+                                 loss_ratio=0.25, funnel_stage=3)
+            index = SeenIndex(index_config)
+            index.record(tested, "https://example.com/sub")
+            index.save()
+
+            # نتیجه بازیابی شده پس از بارگذاری مجدد با نتیجه تست یکسان است
+            to_test, reused = SeenIndex(index_config).partition(
+                [V2RayConfig("vless", "10.0.0.1", 443, "u")])
+            assert to_test == [] and len(reused) == 1
+            for name in ('is_working', 'latency') + RESULT_FIELDS:
+                assert getattr(reused[0], name) == getattr(tested, name), name
+            assert reused[0].rank_key == tested.rank_key
+
+        print("✅ فهرست کانفیگ‌های دیده شده به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست فهرست کانفیگ‌های دیده شده: {e}")
+        traceback.print_exc()
+        return False
+
+
+async def test_probe_funnel():
+    """تست قیف تست مرحله‌ای"""
+    print("🧪 تست قیف تست مرحله‌ای...")
+
+    try:
+        from config_collector import V2RayConfig
+        from probe_engine import AsyncProbeEngine
+        from probe_funnel import ProbeFunnel
+
+        async def echo(reader, writer):
+            writer.write(await reader.read(64))
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(echo, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            configs = [
+                V2RayConfig("vless", "127.0.0.1", port, "uuid-1", raw_config="a"),
+                # همان endpoint با credential دیگر: اتصال TCP مشترک
+                V2RayConfig("vless", "127.0.0.1", port, "uuid-3", raw_config="d"),
+                # سرور TLS ندارد: مرحله ۲ رد می‌شود
+                V2RayConfig("trojan", "127.0.0.1", port, "pass", raw_config="b", sni="localhost"),
+                V2RayConfig("vless", "127.0.0.1", 1, "uuid-2", raw_config="c"),
+            ]
+            engine = AsyncProbeEngine(timeout=1.0, samples=3, sample_interval=0.01)
+            funnel = ProbeFunnel(engine, {'tls_timeout': 1.0, 'protocol_top_n': 2})
+            tested, untested = await funnel.run(configs)
+            # سهم top-N گروه در کل سیکل شمرده می‌شود، نه در هر دسته
+            await funnel.run([V2RayConfig("vless", "127.0.0.1", port, "uuid-4", raw_config="e")])
+            # کانفیگ‌های خارج از بودجه سیکل بدون نتیجه برمی‌گردند، نه حذف
+            spent = ProbeFunnel(engine, {'tcp_budget_seconds': 0})
+            late = [V2RayConfig("vless", "127.0.0.1", port, "uuid-5")]
+            assert await spent.run(late) == ([], late)
+        finally:
+            server.close()
+
+        assert len(tested) == 4 and untested == []
+        assert [(c.is_working, c.funnel_stage) for c in configs] == [
+            (True, 3), (True, 3), (False, 1), (False, 0)]
+        stats = funnel.stats
+        # دسته دوم: یک کانفیگ و یک اتصال TCP دیگر، بدون handshake پروتکل
+        assert (stats['tcp']['tested'], stats['tcp']['probes']) == (5, 3)
+        assert stats['tls']['tested'] == 1 and stats['protocol']['probes'] == 2
+        # آمار چند نمونه برای endpoint سالم، یک تلاش برای endpoint مرده
+        assert configs[0].loss_ratio == 0.0 and configs[0].latency_min <= configs[0].latency_p90
+        assert configs[3].loss_ratio == 1.0
+        assert (configs[2].latency, configs[2].latency_p90, configs[2].jitter) == (0.0, 0.0, 0.0)
+
+        from probe_engine import LatencyStats
+        stats = LatencyStats.from_samples([10.0, 14.0], 3)
+        assert (stats.latency, stats.jitter, round(stats.loss_ratio, 2)) == (12.0, 4.0, 0.33)
+
+        print("✅ قیف تست به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست قیف: {e}")
+        traceback.print_exc()
+        return False
+
+
+def test_probe_scheduler():
+    """تست زمان‌بندی تست با سهمیه‌ها"""
+    print("🧪 تست زمان‌بندی تست...")
+
+    try:
+        from config_collector import V2RayConfig
+        from probe_scheduler import ProbeScheduler
+
+        geo_filter = {'enabled': True, 'blocked_countries': ['CN']}
+        categorization = {'max_configs_per_protocol': 2, 'max_configs_per_country': 100}
+        configs = [V2RayConfig("vless", f"10.0.0.{i}", 443, "u", country="US")
+                   for i in range(6)]
+        configs += [V2RayConfig("trojan", "10.0.1.1", 443, "p", country="DE"),
+                    V2RayConfig("trojan", "10.0.1.2", 443, "p", country="CN")]
+
+        # بدون apply_geo_filter کشورهای مسدود مانند خروجی معمولی تست می‌شوند
+        plain = ProbeScheduler({'quota_headroom': 1.0}, categorization, geo_filter)
+        assert len([c for c in plain.admit(configs) if c.protocol == "trojan"]) == 2
+
+        scheduler = ProbeScheduler(
+            {'quota_headroom': 1.0, 'apply_geo_filter': True}, categorization, geo_filter)
+
+        # پروتکل کم‌تعداد پیش از پروتکل پرتعداد تست می‌شود
+        ordered = scheduler.order(configs)
+        assert ordered[0].protocol == "trojan"
+
+        # با پیشین ۵۰٪ برای سهمیه ۲ حداکثر ۴ کانفیگ vless در جریان پذیرفته می‌شود
+        admitted = scheduler.admit(ordered)
+        assert sum(1 for c in admitted if c.protocol == "vless") == 4
+        assert scheduler.stats['skipped_blocked'] == 1
+
+        for config in admitted:
+            config.is_working = True
+            scheduler.record(config)
+        scheduler.settle(admitted)
+        assert scheduler.admit([V2RayConfig("vless", "10.0.0.9", 443, "u")]) == []
+
+        print("✅ زمان‌بندی تست به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست زمان‌بندی: {e}")
+        traceback.print_exc()
+        return False
+
+
+def test_compiled_forest():
+    """تست یکسان بودن پیش‌بینی مدل فشرده با RandomForest"""
+    print("🧪 تست مدل فشرده...")
+
+    try:
+        import tempfile
+        import numpy as np
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        from compiled_forest import CompiledForest, export_forest
+
+        rng = np.random.RandomState(0)
+        X = rng.rand(300, 15)
+        y = X[:, 0] * 0.5 + (X[:, 9] < 0.3) * 0.4 + rng.normal(0, 0.05, 300)
+        scaler = StandardScaler().fit(X)
+        model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0)
+        model.fit(scaler.transform(X), y)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            export_forest(model, scaler, path, {"f0": 1.0})
+            compiled = CompiledForest.load(path)
+
+        X_test = rng.rand(1000, 15)
+        expected = model.predict(scaler.transform(X_test))
+        assert np.allclose(compiled.predict(X_test), expected, rtol=0, atol=1e-9)
+        assert compiled.feature_importance == {"f0": 1.0}
+
+        print("✅ پیش‌بینی مدل فشرده با sklearn یکسان است")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست مدل فشرده: {e}")
+        traceback.print_exc()
+        return False
+
+
+def test_training_reservoir():
+    """تست برچسب‌گذاری با نتیجه تست بعدی و محدودیت reservoir"""
+    print("🧪 تست reservoir آموزشی...")
+
+    try:
+        import tempfile
+        from training_reservoir import TrainingReservoir
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "reservoir.npz")
+            reservoir = TrainingReservoir(path, capacity=50, max_pending=80)
+
+            # اولین تست فقط ردیف در انتظار می‌سازد، تست بعدی برچسب آن است
+            keys = [f"k{i}" for i in range(100)]
+            assert reservoir.observe(keys, [[i, 0.5] for i in range(100)], [1.0] * 100) == 0
+            assert len(reservoir.pending) == 80
+            assert reservoir.observe(keys[-80:], [[i, 0.1] for i in range(80)], [0.0] * 80) == 80
+
+            X, y = reservoir.snapshot()
+            assert X.shape == (50, 2) and set(X[:, 1]) == {0.5} and set(y) == {0.0}
+
+            reservoir.save()
+            loaded = TrainingReservoir(path, capacity=50, max_pending=80)
+            assert loaded.summary() == {'rows': 50, 'pending': 80, 'seen': 80}
+
+        print("✅ reservoir آموزشی به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست reservoir آموزشی: {e}")
+        traceback.print_exc()
+        return False
+
+
+def test_feature_store():
+    """تست ثبت نتایج، خواندن دسته‌ای و بازیابی feature store از لاگ"""
+    print("🧪 تست feature store...")
+
+    try:
+        import tempfile
+        from feature_store import FeatureStore
+        from ml_config_scorer import MLConfigScorer
+
+        with tempfile.TemporaryDirectory() as tmp:
+            options = {'log_file': os.path.join(tmp, "store.log"),
+                       'snapshot_file': os.path.join(tmp, "store.npz")}
+            store = FeatureStore(options)
+            for latency in (100.0, 200.0, 300.0):
+                store.record(1, True, latency, "source-a")
+            store.record(1, False, source="source-b")
+            store.flush()
+
+            # بازیابی از لاگ، سپس از snapshot پس از فشرده‌سازی
+            for _ in range(2):
+                store = FeatureStore(options)
+                features = store.features([1, 2])
+                assert list(features['tests']) == [4, 0]
+                assert features['recent_success_rate'][0] == 0.75
+                assert features['latency_p50'][0] == 200.0
+                assert features['source_count'][0] == 2
+                store.compact()
+
+            scorer = MLConfigScorer(feature_store=store)
+            score = scorer.score_config({'protocol': 'vless', 'latency': '100ms', 'feature_key': 1})
+            assert score.reliability_score == round(0.75 * 0.4 + 0.5 * 0.6, 3)
+
+        print("✅ feature store به درستی کار می‌کند")
+        return True
+    except Exception as e:
+        print(f"❌ خطا در تست feature store: {e}")
+        traceback.print_exc()
+        return False
+
+
 async def test_connectivity():
     """تست اتصال به منابع"""
     print("🧪 تست اتصال به منابع...")
@@ -206,6 +549,14 @@ async def main():
         ("config_file", test_config_file),
         ("config_collector", test_config_collector),
         ("config_parsing", test_config_parsing),
+        ("streaming_ingest", test_streaming_ingest),
+        ("config_dedup", test_config_dedup),
+        ("seen_index", test_seen_index),
+        ("probe_funnel", test_probe_funnel),
+        ("probe_scheduler", test_probe_scheduler),
+        ("compiled_forest", test_compiled_forest),
+        ("training_reservoir", test_training_reservoir),
+        ("feature_store", test_feature_store),
         ("connectivity", test_connectivity),
         ("api_server", test_api_server),
     ]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seen Config Index
+فهرست دائمی کانفیگ‌های دیده شده و استفاده مجدد از نتیجه تست‌های اخیر
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config_dedup import identity_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEEN_INDEX_CONFIG = {
+    'enabled': True,
+    'index_file': 'cache/seen_index.json',
+    'fresh_working_minutes': 60,
+    'fresh_failed_minutes': 120,
+    'max_streak_multiplier': 4,
+    'max_entry_age_hours': 72,
+    'max_sources': 3,
+}
+
+
+# فیلدهای نتیجه تست V2RayConfig که همراه working/latency ذخیره و بازیابی می‌شوند
+RESULT_FIELDS = ('latency_min', 'latency_p90', 'jitter', 'loss_ratio', 'funnel_stage')
+
+
+@dataclass
+class SeenEntry:
+    """آخرین نتیجه تست یک endpoint"""
+    last_tested: float
+    working: bool
+    latency: float
+    streak: int = 1
+    sources: List[str] = field(default_factory=list)
+    # به ترتیب RESULT_FIELDS (ورودی‌های فایل‌های قدیمی فقط پنج فیلد اول را دارند)
+    latency_min: float = 0.0
+    latency_p90: float = 0.0
+    jitter: float = 0.0
+    loss_ratio: float = 0.0
+    funnel_stage: int = 0
+
+
+class SeenIndex:
+    """
+    فهرست کانفیگ‌ها با کلید هویت استاندارد
+
+    نتیجه تست کانفیگی که هنوز تازه است (بر اساس نتیجه و تعداد تکرار
+    متوالی همان نتیجه) دوباره استفاده می‌شود و کانفیگ تست نمی‌شود.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULT_SEEN_INDEX_CONFIG)
+        self.config.update(config or {})
+        self.index_file = self.config['index_file']
+        self.entries: Dict[str, SeenEntry] = {}
+        self.stats = {'reused': 0, 'stale': 0, 'new': 0}
+        self._load()
+
+    @staticmethod
+    def key_for(config) -> str:
+        return f"{identity_hash(config):016x}"
+
+    def _load(self):
+        """بارگذاری فهرست از دیسک"""
+        if not os.path.exists(self.index_file):
+            return
+
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, entry in data.items():
+                self.entries[key] = SeenEntry(*entry)
+            logger.info(f"Loaded {len(self.entries)} seen configs")
+        except Exception as e:
+            logger.error(f"Error loading seen index: {e}")
+
+    def save(self):
+        """حذف ورودی‌های قدیمی و ذخیره فهرست روی دیسک"""
+        oldest = time.time() - self.config['max_entry_age_hours'] * 3600
+        self.entries = {key: entry for key, entry in self.entries.items()
+                        if entry.last_tested >= oldest}
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+            data = {key: [entry.last_tested, entry.working, entry.latency,
+                          entry.streak, entry.sources] +
+                    [getattr(entry, name) for name in RESULT_FIELDS]
+                    for key, entry in self.entries.items()}
+            with open(self.index_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+        except Exception as e:
+            logger.error(f"Error saving seen index: {e}")
+
+    def fresh_seconds(self, entry: SeenEntry) -> float:
+        """مدت تازه ماندن نتیجه؛ با تکرار همان نتیجه افزایش می‌یابد"""
+        base = self.config['fresh_working_minutes'] if entry.working \
+            else self.config['fresh_failed_minutes']
+        return base * 60 * min(entry.streak, self.config['max_streak_multiplier'])
+
+    def partition(self, configs: List) -> Tuple[List, List]:
+        """
+        جدا کردن کانفیگ‌های نیازمند تست از کانفیگ‌هایی با نتیجه تازه
+
+        Returns:
+            (کانفیگ‌های قابل تست به ترتیب اولویت، کانفیگ‌های با نتیجه بازیابی شده)
+        """
+        now = time.time()
+        to_test: List[Tuple[int, int, object]] = []
+        reused = []
+
+        for config in configs:
+            entry = self.entries.get(self.key_for(config))
+            if entry is None:
+                self.stats['new'] += 1
+                to_test.append((0, 0, config))
+                continue
+
+            if now - entry.last_tested < self.fresh_seconds(entry):
+                config.is_working = entry.working
+                config.latency = entry.latency
+                for name in RESULT_FIELDS:
+                    setattr(config, name, getattr(entry, name))
+                reused.append(config)
+                self.stats['reused'] += 1
+                continue
+
+            # کانفیگ‌های جدید اول، سپس سالم‌های قبلی، و در آخر خرابی‌های تکراری
+            self.stats['stale'] += 1
+            rank = 1 if entry.working else 2
+            to_test.append((rank, 0 if entry.working else entry.streak, config))
+
+        to_test.sort(key=lambda item: (item[0], item[1]))
+        return [config for _, _, config in to_test], reused
+
+    def record(self, config, source: Optional[str] = None):
+        """ثبت نتیجه تست یک کانفیگ (is_working، latency و RESULT_FIELDS)"""
+        key = self.key_for(config)
+        working = config.is_working
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = SeenEntry(time.time(), working, config.latency, 0)
+
+        entry.streak = entry.streak + 1 if entry.working == working else 1
+        entry.last_tested = time.time()
+        entry.working = working
+        entry.latency = config.latency
+        for name in RESULT_FIELDS:
+            setattr(entry, name, getattr(config, name))
+        if source and source not in entry.sources:
+            entry.sources = (entry.sources + [source])[-self.config['max_sources']:]
+
+    def new_cycle(self):
+        self.stats = {'reused': 0, 'stale': 0, 'new': 0}
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.stats, indexed=len(self.entries))
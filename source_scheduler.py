@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptive Source Scheduler
+آمار دریافت هر منبع و زمان‌بندی تطبیقی دریافت منابع
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, asdict, fields
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULER_CONFIG = {
+    'enabled': True,
+    'stats_file': 'cache/source_stats.json',
+    'high_yield_ratio': 0.05,
+    'max_backoff_cycles': 8,
+    'unchanged_backoff_cycles': 2,
+    'quarantine_after_failures': 5,
+    'quarantine_hours': 12,
+    'min_timeout': 5,
+    'max_timeout': 30,
+    'timeout_latency_factor': 4,
+}
+
+
+@dataclass
+class SourceStats:
+    """آمار دریافت یک منبع در سیکل‌های متوالی"""
+    url: str
+    fetches: int = 0
+    failures: int = 0
+    failure_streak: int = 0
+    unchanged_streak: int = 0
+    low_yield_streak: int = 0
+    last_bytes: int = 0
+    total_bytes: int = 0
+    last_latency_ms: float = 0.0
+    avg_latency_ms: float = 0.0
+    last_configs: int = 0
+    last_unique: int = 0
+    last_working: int = 0
+    working_yield: float = 0.0
+    last_fetch_cycle: int = 0
+    next_due_cycle: int = 0
+    quarantined_until: float = 0.0
+
+
+class SourceScheduler:
+    """زمان‌بندی دریافت منابع بر اساس بازدهی کانفیگ‌های سالم"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULT_SCHEDULER_CONFIG)
+        self.config.update(config or {})
+        self.stats_file = self.config['stats_file']
+        self.cycle = 0
+        self.sources: Dict[str, SourceStats] = {}
+        self._fetched_this_cycle: set = set()
+        self._load()
+
+    def _load(self):
+        """بارگذاری آمار منابع از دیسک"""
+        if not os.path.exists(self.stats_file):
+            return
+
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            known = {field.name for field in fields(SourceStats)}
+            self.cycle = data.get('cycle', 0)
+            for url, entry in data.get('sources', {}).items():
+                self.sources[url] = SourceStats(
+                    **{k: v for k, v in entry.items() if k in known})
+            logger.info(f"Loaded stats for {len(self.sources)} sources")
+        except Exception as e:
+            logger.error(f"Error loading source stats: {e}")
+
+    def save(self):
+        """ذخیره آمار منابع روی دیسک"""
+        try:
+            os.makedirs(os.path.dirname(self.stats_file) or '.', exist_ok=True)
+            data = {
+                'cycle': self.cycle,
+                'sources': {url: asdict(stats) for url, stats in self.sources.items()}
+            }
+            with open(self.stats_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"Error saving source stats: {e}")
+
+    @property
+    def fetched_sources(self) -> List[str]:
+        """منابعی که در سیکل جاری دریافت شده‌اند"""
+        return list(self._fetched_this_cycle)
+
+    def _get(self, url: str) -> SourceStats:
+        if url not in self.sources:
+            self.sources[url] = SourceStats(url=url)
+        return self.sources[url]
+
+    def select_sources(self, urls: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        انتخاب منابع این سیکل
+
+        Returns:
+            (منابع قابل دریافت به ترتیب بازدهی، منابع عقب‌افتاده که فعلاً دریافت نمی‌شوند)
+            منابع قرنطینه شده در هیچ‌کدام نیستند.
+        """
+        self.cycle += 1
+        self._fetched_this_cycle = set()
+        now = time.time()
+
+        due, deferred = [], []
+        for url in urls:
+            stats = self._get(url)
+            if stats.quarantined_until > now:
+                continue
+            if stats.next_due_cycle <= self.cycle:
+                due.append(url)
+            else:
+                deferred.append(url)
+
+        # منابع پربازده اول دریافت می‌شوند تا تست آن‌ها زودتر شروع شود
+        due.sort(key=lambda url: self.sources[url].working_yield, reverse=True)
+
+        quarantined = len(urls) - len(due) - len(deferred)
+        logger.info(
+            f"📅 زمان‌بندی منابع (سیکل {self.cycle}): {len(due)} دریافت، "
+            f"{len(deferred)} عقب‌افتاده، {quarantined} قرنطینه")
+        return due, deferred
+
+    def timeout_for(self, url: str) -> float:
+        """
+        timeout تطبیقی اتصال/خواندن بر اساس تأخیر تاریخی منبع
+
+        تأخیر ثبت شده فقط زمان شبکه تا رسیدن هدرهاست و مقدار حاصل برای
+        sock_connect/sock_read استفاده می‌شود، نه زمان کل دریافت بدنه.
+        """
+        stats = self.sources.get(url)
+        if not stats or not stats.avg_latency_ms:
+            return float(self.config['max_timeout'])
+
+        timeout = stats.avg_latency_ms / 1000.0 * \
+            self.config['timeout_latency_factor']
+        return float(min(self.config['max_timeout'], max(self.config['min_timeout'], timeout)))
+
+    def record_fetch(self, url: str, success: bool, latency_ms: float = 0.0,
+                     size_bytes: int = 0, configs: int = 0, unchanged: bool = False,
+                     cached: bool = False):
+        """
+        ثبت نتیجه دریافت یک منبع
+
+        برای پاسخ از کش محلی (cached) فقط دریافت در این سیکل و تعداد
+        کانفیگ‌ها ثبت می‌شود؛ تأخیر و سابقه خطا و تغییر نکردن دست نمی‌خورند.
+        """
+        stats = self._get(url)
+        self._fetched_this_cycle.add(url)
+        stats.fetches += 1
+        stats.last_fetch_cycle = self.cycle
+
+        if cached:
+            stats.last_configs = configs
+            return
+
+        if not success:
+            stats.failures += 1
+            stats.failure_streak += 1
+            return
+
+        stats.failure_streak = 0
+        stats.unchanged_streak = stats.unchanged_streak + 1 if unchanged else 0
+        stats.last_bytes = size_bytes
+        stats.total_bytes += size_bytes
+        stats.last_latency_ms = latency_ms
+        stats.avg_latency_ms = latency_ms if not stats.avg_latency_ms else \
+            0.7 * stats.avg_latency_ms + 0.3 * latency_ms
+        stats.last_configs = configs
+
+    def record_yield(self, url: str, unique: int, working: int):
+        """ثبت سهم کانفیگ‌های منحصر به فرد و سالم یک منبع در این سیکل"""
+        stats = self._get(url)
+        stats.last_unique = unique
+        stats.last_working = working
+        ratio = working / stats.last_configs if stats.last_configs else 0.0
+        stats.working_yield = ratio if stats.fetches <= 1 else \
+            0.5 * stats.working_yield + 0.5 * ratio
+
+    def end_cycle(self):
+        """محاسبه زمان دریافت بعدی منابع دریافت شده و ذخیره آمار"""
+        config = self.config
+        for url in self._fetched_this_cycle:
+            stats = self.sources[url]
+
+            if stats.failure_streak >= config['quarantine_after_failures']:
+                stats.quarantined_until = time.time() + \
+                    config['quarantine_hours'] * 3600
+                stats.next_due_cycle = self.cycle + 1
+                logger.warning(
+                    f"🚫 قرنطینه منبع پس از {stats.failure_streak} خطای متوالی: {url}")
+                continue
+
+            if stats.failure_streak:
+                # تلاش مجدد با فاصله افزایشی
+                interval = 2 ** (stats.failure_streak - 1)
+            elif stats.working_yield >= config['high_yield_ratio'] or (stats.last_working and stats.last_unique):
+                stats.low_yield_streak = 0
+                interval = 1
+            else:
+                stats.low_yield_streak += 1
+                interval = 2 ** stats.low_yield_streak
+
+            if stats.unchanged_streak:
+                interval = max(interval, config['unchanged_backoff_cycles'])
+
+            stats.next_due_cycle = self.cycle + \
+                min(interval, config['max_backoff_cycles'])
+
+        self.save()
+
+    def summary(self) -> Dict:
+        """خلاصه وضعیت منابع برای گزارش‌ها"""
+        now = time.time()
+        quarantined = [s.url for s in self.sources.values()
+                       if s.quarantined_until > now]
+        top = sorted(self.sources.values(),
+                     key=lambda s: s.last_working, reverse=True)[:5]
+        return {
+            'cycle': self.cycle,
+            'tracked_sources': len(self.sources),
+            'fetched_last_cycle': len(self._fetched_this_cycle),
+            'quarantined': len(quarantined),
+            'top_sources': [{'url': s.url, 'working': s.last_working, 'unique': s.last_unique}
+                            for s in top],
+        }
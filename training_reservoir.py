@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Training Reservoir
+نمونه محدود و دائمی از نتایج واقعی تست‌ها برای آموزش تدریجی مدل کیفیت
+"""
+
+import logging
+import os
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AI_TRAINING_CONFIG = {
+    'enabled': True,
+    'reservoir_file': 'models/training_reservoir.npz',
+    'reservoir_size': 20000,
+    'max_pending': 50000,
+    'min_rows': 200,
+    'trees_per_update': 10,
+    'max_trees': 100,
+}
+
+
+class TrainingReservoir:
+    """
+    reservoir آموزشی با برچسب نتیجه تست بعدی
+
+    ردیف ویژگی هر کانفیگ تا تست بعدی همان کانفیگ در انتظار می‌ماند و
+    نتیجه آن تست برچسبش می‌شود؛ بنابراین مدل پایداری آینده را از روی
+    وضعیت فعلی یاد می‌گیرد، نه نتیجه‌ای که در خود ویژگی‌ها هست.
+    ردیف‌های برچسب‌دار با نمونه‌برداری reservoir (الگوریتم R) در اندازه
+    ثابت نگه داشته می‌شوند تا هزینه آموزش هر سیکل محدود بماند.
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 20000,
+                 max_pending: int = 50000):
+        self.path = path
+        self.capacity = capacity
+        self.max_pending = max_pending
+
+        self.rows: List[List[float]] = []
+        self.labels: List[float] = []
+        self.seen = 0  # تعداد کل ردیف‌های برچسب‌دار ارائه شده
+        self.pending: Dict[str, List[float]] = {}
+
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _load(self):
+        """بارگذاری reservoir از دیسک"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self.rows = data['X'].astype(np.float64).tolist()[:self.capacity]
+                self.labels = data['y'].astype(np.float64).tolist()[:self.capacity]
+                self.seen = max(int(data['seen']), len(self.labels))
+                self.pending = dict(zip(data['pending_keys'].tolist(),
+                                        data['pending_X'].astype(np.float64).tolist()))
+            logger.info(
+                f"Loaded training reservoir: {len(self.labels)} rows, {len(self.pending)} pending")
+        except Exception as e:
+            logger.error(f"Error loading training reservoir: {e}")
+
+    def save(self):
+        """ذخیره reservoir روی دیسک (جایگزینی اتمیک فایل)"""
+        if not self.path:
+            return
+
+        with self._lock:
+            X = np.array(self.rows, dtype=np.float32)
+            y = np.array(self.labels, dtype=np.float32)
+            pending_keys = np.array(list(self.pending.keys()), dtype=str)
+            pending_X = np.array(list(self.pending.values()), dtype=np.float32)
+            seen = self.seen
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                np.savez(f, X=X, y=y, seen=np.int64(seen),
+                         pending_keys=pending_keys, pending_X=pending_X)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving training reservoir: {e}")
+
+    def add(self, row: List[float], label: float):
+        """افزودن یک ردیف برچسب‌دار (الگوریتم R)"""
+        with self._lock:
+            self._add(row, label)
+
+    def _add(self, row: List[float], label: float):
+        self.seen += 1
+        if len(self.labels) < self.capacity:
+            self.rows.append(row)
+            self.labels.append(label)
+            return
+        index = self._random.randrange(self.seen)
+        if index < self.capacity:
+            self.rows[index] = row
+            self.labels[index] = label
+
+    def observe(self, keys: List[str], rows: List[List[float]], outcomes: List[float]) -> int:
+        """
+        ثبت نتیجه تست کانفیگ‌ها
+
+        نتیجه هر کانفیگ برچسب ردیف در انتظار قبلی آن می‌شود و ردیف فعلی
+        تا تست بعدی در انتظار می‌ماند.
+
+        Returns:
+            تعداد ردیف‌های برچسب‌دار جدید
+        """
+        labeled = 0
+        with self._lock:
+            for key, row, outcome in zip(keys, rows, outcomes):
+                previous = self.pending.pop(key, None)
+                if previous is not None:
+                    self._add(previous, outcome)
+                    labeled += 1
+                self.pending[key] = row
+
+            # حذف قدیمی‌ترین ردیف‌های در انتظار
+            overflow = len(self.pending) - self.max_pending
+            if overflow > 0:
+                for key in list(self.pending)[:overflow]:
+                    del self.pending[key]
+        return labeled
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """کپی ردیف‌ها و برچسب‌ها برای آموزش"""
+        with self._lock:
+            return (np.array(self.rows, dtype=np.float64),
+                    np.array(self.labels, dtype=np.float64))
+
+    def summary(self) -> Dict[str, int]:
+        return {'rows': len(self.labels), 'pending': len(self.pending), 'seen': self.seen}
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URI Tokenizer
+تجزیه تک‌گذری لینک‌های کانفیگ (vless/trojan/hysteria/tuic/...) بدون regex
+"""
+
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import unquote
+
+
+class ParsedURI(NamedTuple):
+    """اجزای یک لینک کانفیگ"""
+    scheme: str
+    userinfo: str
+    host: str
+    port: int
+    path: str
+    query: Dict[str, str]
+    fragment: str
+
+    def param(self, *names: str, default: str = '') -> str:
+        """اولین پارامتر query موجود از بین نام‌های داده شده"""
+        for name in names:
+            value = self.query.get(name)
+            if value:
+                return value
+        return default
+
+
+def _unquote(value: str) -> str:
+    return unquote(value) if '%' in value else value
+
+
+def parse_query(query: str) -> Dict[str, str]:
+    """تجزیه رشته query به دیکشنری (اولین مقدار هر کلید)"""
+    params: Dict[str, str] = {}
+    for pair in query.split('&'):
+        if not pair:
+            continue
+        key, sep, value = pair.partition('=')
+        if key not in params:
+            params[key] = _unquote(value) if sep else ''
+    return params
+
+
+def tokenize_uri(uri: str) -> Optional[ParsedURI]:
+    """
+    تجزیه یک لینک به scheme، userinfo، host، port، path، query و fragment
+
+    آدرس‌های IPv6 داخل براکت پشتیبانی می‌شوند. لینک‌های بدون host یا
+    پورت عددی معتبر None برمی‌گردانند.
+
+    Args:
+        uri: لینک کانفیگ، مثل vless://uuid@host:443?security=tls#name
+
+    Returns:
+        ParsedURI یا None
+    """
+    scheme_end = uri.find('://')
+    if scheme_end <= 0:
+        return None
+    scheme = uri[:scheme_end].lower()
+    rest = uri[scheme_end + 3:]
+
+    fragment = ''
+    hash_pos = rest.find('#')
+    if hash_pos != -1:
+        fragment = _unquote(rest[hash_pos + 1:])
+        rest = rest[:hash_pos]
+
+    query = ''
+    query_pos = rest.find('?')
+    if query_pos != -1:
+        query = rest[query_pos + 1:]
+        rest = rest[:query_pos]
+
+    path = ''
+    path_pos = rest.find('/')
+    if path_pos != -1:
+        path = rest[path_pos:]
+        rest = rest[:path_pos]
+
+    userinfo = ''
+    at_pos = rest.rfind('@')
+    if at_pos != -1:
+        userinfo = rest[:at_pos]
+        rest = rest[at_pos + 1:]
+
+    if rest.startswith('['):
+        # IPv6: [2001:db8::1]:443
+        close = rest.find(']')
+        if close == -1:
+            return None
+        host = rest[1:close]
+        port_str = rest[close + 2:] if rest[close + 1:close + 2] == ':' else ''
+    else:
+        host, _, port_str = rest.rpartition(':')
+
+    if not host or not port_str.isdecimal():
+        return None
+
+    return ParsedURI(scheme, userinfo, host, int(port_str), path,
+                     parse_query(query) if query else {}, fragment)